@@ -0,0 +1,226 @@
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+from constants import *
+from metrics import aggregator
+from ppc_projet import (TrafficLight, bulk_arrival, coordinator_step, light_step, make_batch, reserve_license_plates,
+                        run_virtual)
+from signal_policy import POLICIES
+from section_ring import RingSection
+from section_store import SectionManager
+
+GEN_TICK = 0.01  # pas de génération des véhicules (secondes)
+
+
+def _process_usage():
+    # Consommation du processus courant : CPU (s) et pic de mémoire résidente (Ko sous Linux)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {"cpu_s": round(usage.ru_utime + usage.ru_stime, 4), "peak_rss_kb": usage.ru_maxrss}
+
+
+SectionManager.register("usage", callable=_process_usage)
+
+
+def _headless():
+    # Pas d'affichage pendant la mesure
+    sys.stdout = open(os.devnull, "w")
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 6)
+
+
+# === Rôles mesurés : mêmes étapes que les processus de ppc_projet.py, sans display ===
+def bench_generator(section_queues, traffic_light, rate, stop, results):
+    _headless()
+    traffic_light.metrics.bind("generator")
+    generated, ipc_bytes, owed = 0, 0, 0.0
+    next_tick = time.monotonic()
+    while not stop.is_set():
+        owed += rate * GEN_TICK
+        count = int(owed)
+        if count:
+            # Un bloc de plaques et un message par section pour tout le pas
+            owed -= count
+            batches = make_batch(reserve_license_plates(count), count)
+            bulk_arrival(section_queues, batches, traffic_light)
+            ipc_bytes += sum(len(blob) for blob in batches.values())
+            generated += count
+        next_tick += GEN_TICK
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+    results.put(("generator", {"generated": generated, "ipc_bytes": ipc_bytes, **_process_usage()}))
+
+
+def bench_light_controller(traffic_light, interval, stop, results):
+    _headless()
+    from threading import Event
+    emergency_event = Event()
+    last_state = None
+    while not stop.wait(interval):
+        last_state = light_step(traffic_light, emergency_event, lambda message, level=None: None, last_state)
+    results.put(("light_controller", _process_usage()))
+
+
+def bench_coordinator(traffic_light, section_queues, tick, stop, results):
+    _headless()
+    traffic_light.metrics.bind("coordinator")
+
+    class CountingSection:
+        # Compte les octets d'enregistrements échangés avec le manager
+        def __init__(self, proxy):
+            self.proxy = proxy
+
+        def snapshot(self, priorities=(1, 2, 3)):
+            blob = self.proxy.snapshot(priorities)
+            counters["ipc_bytes"] += len(blob)
+            return blob
+
+        def remove_many(self, blob):
+            counters["ipc_bytes"] += len(blob)
+            removed = self.proxy.remove_many(blob)
+            counters["ipc_bytes"] += len(removed)
+            return removed
+
+    counters = {"ipc_bytes": 0}
+    # Avec les anneaux, snapshot et remove_many travaillent sur le SectionStore local du coordinateur :
+    # les seuls octets échangés sont ceux des anneaux, déjà comptés une fois par le générateur qui les écrit
+    sections = {d: q if isinstance(q, RingSection) else CountingSection(q) for d, q in section_queues.items()}
+    latencies = []
+    while not stop.is_set():
+        seen = traffic_light.generations()
+        passed = coordinator_step(traffic_light, sections, lambda message, level=None: None)
+        now = time.time()
+        for v in passed:
+            latencies.append(now - v['arrival'])
+        if not passed:
+            traffic_light.wait_for_change(seen, timeout=tick)
+    latencies.sort()
+    results.put(("coordinator", {
+        "passed": len(latencies),
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "latency_p99_s": percentile(latencies, 99),
+        "ipc_bytes": counters["ipc_bytes"],
+        **_process_usage()
+    }))
+
+
+def run_benchmark(rate, duration=10.0, tick=0.1, light_interval=2.0, sections="ring"):
+    """Fait tourner le pipeline sans affichage pendant ``duration`` secondes à ``rate`` véhicules/s.
+
+    ``sections`` : files des sections en anneaux de mémoire partagée ("ring") ou
+    servies par un processus manager ("manager").
+    """
+    if sections == "ring":
+        manager = None
+        section_queues = {d: RingSection() for d in DIRECTIONS}
+    else:
+        manager = SectionManager()
+        manager.start()
+        section_queues = {d: manager.SectionStore() for d in DIRECTIONS}
+    traffic_light = TrafficLight()
+    stop = mp.Event()
+    results = mp.Queue()
+    processes = [
+        mp.Process(target=bench_light_controller, args=(traffic_light, light_interval, stop, results)),
+        mp.Process(target=bench_generator, args=(section_queues, traffic_light, rate, stop, results)),
+        mp.Process(target=bench_coordinator, args=(traffic_light, section_queues, tick, stop, results)),
+    ]
+    start = time.monotonic()
+    # L'agrégateur de KPI tourne à côté, hors du chemin mesuré
+    kpi_process = mp.Process(target=aggregator, args=(traffic_light.metrics,), daemon=True)
+    kpi_process.start()
+    for p in processes:
+        p.start()
+    time.sleep(duration)
+    kpis = traffic_light.metrics.read()
+    kpi_process.terminate()
+    stop.set()
+    roles = dict(results.get() for _ in processes)
+    for p in processes:
+        p.join()
+    elapsed = time.monotonic() - start
+    backlog = sum(q.size() for q in section_queues.values())
+    if manager is not None:
+        roles["section_manager"] = manager.usage()._getvalue()
+        manager.shutdown()
+    else:
+        for queue in section_queues.values():
+            queue.unlink()
+
+    coordinator = roles["coordinator"]
+    return {
+        "arrival_rate": rate,
+        "sections": sections,
+        "duration_s": round(elapsed, 3),
+        "generated": roles["generator"]["generated"],
+        "passed": coordinator["passed"],
+        "backlog": backlog,
+        "throughput_vps": round(coordinator["passed"] / elapsed, 2),
+        "latency_s": {"p50": coordinator["latency_p50_s"],
+                      "p95": coordinator["latency_p95_s"],
+                      "p99": coordinator["latency_p99_s"]},
+        "ipc_bytes": roles["generator"]["ipc_bytes"] + coordinator["ipc_bytes"],
+        "kpi_windows": {window: kpis[window] for window in ("1s", "10s", "60s")} if kpis else None,
+        "processes": {name: {"cpu_s": r["cpu_s"], "peak_rss_kb": r["peak_rss_kb"]} for name, r in roles.items()},
+    }
+
+
+def compare_policies(arrival_rates, duration=3600.0, seed=0):
+    """Compare les politiques de feux en temps virtuel sur le même flux d'arrivées (même graine)."""
+    results = {}
+    for name, policy_class in POLICIES.items():
+        passed = run_virtual(duration, seed=seed, policy=policy_class(), arrival_rates=arrival_rates,
+                             ambulances=False, verbose=False)
+        waits = sorted(v['passed_at'] - v['arrival'] for v in passed)
+        results[name] = {
+            "passed": len(passed),
+            "throughput_vps": round(len(passed) / duration, 4),
+            "mean_wait_s": round(sum(waits) / len(waits), 3) if waits else None,
+            "wait_p95_s": percentile(waits, 95),
+            "wait_max_s": round(waits[-1], 3) if waits else None,
+        }
+    return {"arrival_rates": arrival_rates, "duration_s": duration, "seed": seed, "policies": results}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Banc de mesure sans affichage du carrefour")
+    parser.add_argument("--rates", default="10,100,1000,10000",
+                        help="taux d'arrivée à mesurer (véhicules/s), séparés par des virgules")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée de chaque mesure (secondes)")
+    parser.add_argument("--tick", type=float, default=0.1,
+                        help="attente maximale du coordinateur sans changement de feux ni arrivée (secondes)")
+    parser.add_argument("--light-interval", type=float, default=2.0, help="période des feux (secondes)")
+    parser.add_argument("--sections", choices=["ring", "manager"], default="ring",
+                        help="files des sections : anneaux en mémoire partagée ou proxys d'un processus manager")
+    parser.add_argument("--output", help="fichier JSON de sortie (défaut : sortie standard)")
+    parser.add_argument("--compare-policies", metavar="N,S,E,W",
+                        help="comparer feux fixes et actionnés en temps virtuel avec ces débits d'arrivée "
+                             "par entrée (véhicules/s), par exemple 0.4,0.4,0.05,0.05")
+    parser.add_argument("--seed", type=int, default=0, help="graine du flux d'arrivées de --compare-policies")
+    args = parser.parse_args()
+
+    if args.compare_policies:
+        rates = dict(zip([N, S, E, W], (float(r) for r in args.compare_policies.split(","))))
+        report = json.dumps(compare_policies(rates, args.duration, args.seed), indent=2)
+    else:
+        runs = [run_benchmark(float(rate), args.duration, args.tick, args.light_interval, args.sections)
+                for rate in args.rates.split(",")]
+        report = json.dumps({"runs": runs}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
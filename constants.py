@@ -0,0 +1,27 @@
+# === Constantes partagées par la simulation du carrefour ===
+N = "North"
+S = "South"
+W = "West"
+E = "East"
+DIRECTIONS = [N, S, W, E]
+LIGHT_GREEN = 1
+LIGHT_RED = 0
+UPDATE_INTERVAL = 8  # Intervalle de mise à jour des feux en mode normal (secondes)
+
+# Indexation des directions pour un accès plus facile
+DIR_INDEX = {N: 0, S: 1, E: 2, W: 3}
+DIR_INDEX_REVERSE = {v: k for k, v in DIR_INDEX.items()}
+
+# Direction opposée (utilisée pour gérer les véhicules tournant à gauche en attente)
+OPPOSITE_DIR = {
+    N: S, S: N,
+    E: W, W: E
+}
+
+# Priorités des mouvements : Tout droit (1) > Droite (2) > Gauche (3)
+PRIORITY_MAP = {
+    N: {S: 1, W: 2, E: 3},
+    S: {N: 1, E: 2, W: 3},
+    E: {W: 1, N: 2, S: 3},
+    W: {E: 1, S: 2, N: 3}
+}
@@ -0,0 +1,214 @@
+import os
+import selectors
+import socket
+import struct
+import threading
+
+from recent_events import EMERGENCY, NORMAL, record_severity
+from vehicle_record import RECORD_SIZE
+
+# Chaque trame : longueur de la charge utile (4 octets, big-endian), type (1 octet), charge utile
+FRAME = struct.Struct("!IB")
+TEXT = 0  # message texte UTF-8
+PASSED = 1  # véhicules passés : enregistrements de vehicle_record (16 octets chacun), à la suite
+ALERT = 2  # message texte UTF-8 d'urgence (ambulance, préemption), gardé à part par le display
+MAX_PENDING = 10000  # trames gardées en mémoire pendant une déconnexion
+RECV_SIZE = 1 << 16  # taille initiale du tampon de réception d'une connexion
+
+
+# === Côté producteur : une connexion persistante par processus ===
+class DisplayChannel:
+    """Connexion TCP longue durée vers le display, avec envoi par lots.
+
+    ``send`` et ``send_passed`` ne font que mettre une trame en attente ; un thread
+    vide le lot toutes les ``flush_interval`` secondes et se reconnecte si besoin.
+    """
+
+    def __init__(self, host, port, flush_interval=0.05):
+        self.address = (host, port)
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._sock = None
+        self._warned = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def send(self, message, level=NORMAL):
+        # ``level`` (recent_events.NORMAL / EMERGENCY) choisit le type de trame
+        data = message.encode()
+        self._queue(FRAME.pack(len(data), ALERT if level == EMERGENCY else TEXT) + data)
+
+    def send_passed(self, records):
+        # Un lot d'enregistrements de véhicules passés, en une seule trame et sans mise en texte
+        if records:
+            self._queue(FRAME.pack(len(records), PASSED) + records)
+
+    def _queue(self, frame):
+        with self._lock:
+            self._pending.append(frame)
+            if len(self._pending) > MAX_PENDING:
+                del self._pending[:len(self._pending) - MAX_PENDING]
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return True
+        payload = b"".join(batch)
+        try:
+            if self._sock is None:
+                self._sock = socket.create_connection(self.address)
+                self._warned = False
+            self._sock.sendall(payload)
+            return True
+        except OSError:
+            if not self._warned:
+                print("Serveur de Display indisponible, réessai en cours...")
+                self._warned = True
+            self._disconnect()
+            # Remettre le lot en tête pour le prochain essai
+            with self._lock:
+                self._pending[:0] = batch
+                if len(self._pending) > MAX_PENDING:
+                    del self._pending[:len(self._pending) - MAX_PENDING]
+            return False
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        self._disconnect()
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
+
+
+_channel = None
+_channel_pid = None
+
+
+def get_display_channel(host, port):
+    # Un canal par processus : ne pas réutiliser celui hérité du parent après un fork
+    global _channel, _channel_pid
+    if _channel is None or _channel_pid != os.getpid():
+        _channel = DisplayChannel(host, port)
+        _channel_pid = os.getpid()
+    return _channel
+
+
+# === Côté display : une seule boucle selectors pour toutes les connexions ===
+class FrameReader:
+    """Tampon de réception d'une connexion, découpé en trames sans copie.
+
+    ``recv`` lit directement dans le tampon (``recv_into``) ; ``frames`` parcourt
+    en une passe toutes les trames complètes et renvoie leur charge utile sous
+    forme de ``memoryview`` sur le tampon. Seule la fin incomplète d'une trame
+    est recopiée en tête du tampon avant la lecture suivante.
+    """
+
+    def __init__(self, size=RECV_SIZE):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = self.end = 0
+
+    def recv(self, conn):
+        if self.end == len(self.buffer):
+            self._make_room()
+        n = conn.recv_into(self.view[self.end:])
+        self.end += n
+        return n
+
+    def _make_room(self):
+        pending = self.end - self.start
+        if self.start == 0:
+            # Une trame plus grande que le tampon : doubler sa taille
+            old = self.view
+            self.buffer = bytearray(2 * len(self.buffer))
+            self.view = memoryview(self.buffer)
+            self.view[:pending] = old[:pending]
+        else:
+            self.view[:pending] = bytes(self.view[self.start:self.end])
+        self.start, self.end = 0, pending
+
+    def frames(self):
+        """Trames complètes ``(type, charge utile)`` ; les vues sont valables jusqu'au prochain ``recv``."""
+        view, pos, end = self.view, self.start, self.end
+        frames = []
+        while end - pos >= FRAME.size:
+            length, kind = FRAME.unpack_from(view, pos)
+            stop = pos + FRAME.size + length
+            if stop > end:
+                break
+            frames.append((kind, view[pos + FRAME.size:stop]))
+            pos = stop
+        if pos == end:
+            pos = end = 0  # tampon vide : repartir du début sans copie
+        self.start, self.end = pos, end
+        return frames
+
+
+def dispatch(frames, on_message):
+    # Texte : une chaîne décodée directement depuis le tampon ; véhicules passés : un enregistrement par message
+    for kind, payload in frames:
+        if kind == TEXT:
+            on_message(str(payload, "utf-8"), NORMAL)
+        elif kind == ALERT:
+            on_message(str(payload, "utf-8"), EMERGENCY)
+        elif kind == PASSED:
+            records = bytes(payload)  # une seule copie du lot, que les messages découpent
+            for offset in range(0, len(records), RECORD_SIZE):
+                record = records[offset:offset + RECORD_SIZE]
+                on_message(record, record_severity(record))
+
+
+def serve_display(host, port, on_message):
+    """Accepte les producteurs et appelle ``on_message`` pour chaque message reçu.
+
+    ``on_message(message, gravité)`` reçoit une ``str`` pour un message texte, et un
+    enregistrement de vehicle_record (``bytes``) pour chaque véhicule passé ; la gravité
+    (recent_events.NORMAL / EMERGENCY) vient du type de trame ou du type du véhicule.
+    """
+    sel = selectors.DefaultSelector()
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((host, port))
+    server_socket.listen()
+    server_socket.setblocking(False)
+    sel.register(server_socket, selectors.EVENT_READ, None)
+
+    while True:
+        for key, _ in sel.select():
+            if key.data is None:
+                conn, _ = server_socket.accept()
+                conn.setblocking(False)
+                sel.register(conn, selectors.EVENT_READ, FrameReader())
+                continue
+            conn, reader = key.fileobj, key.data
+            try:
+                received = reader.recv(conn)
+            except BlockingIOError:
+                continue
+            except ConnectionError:
+                received = 0
+            if not received:
+                sel.unregister(conn)
+                conn.close()
+                continue
+            dispatch(reader.frames(), on_message)
+
+
+def start_display_listener(host, port, on_message):
+    listener_thread = threading.Thread(target=serve_display, args=(host, port, on_message), daemon=True)
+    listener_thread.start()
+    return listener_thread
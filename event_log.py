@@ -0,0 +1,211 @@
+import os
+import struct
+import threading
+import time
+from multiprocessing.util import Finalize
+
+from constants import *
+from phase_plan import PLANS
+from vehicle_record import RECORD, VEHICLE_TYPES
+
+# === Journal binaire des événements de la simulation ===
+# En-tête : magique, version, nom du plan de phases ; puis des événements de taille fixe :
+# genre, classe du véhicule, entrée (ou direction d'urgence), sortie, priorité du mouvement
+# (ou mode urgence), numéro de plaque (ou indice de phase), instant, valeur (attente ou latence)
+LOG_MAGIC = b"PPCE"
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct("<4sH16s")
+EVENT = struct.Struct("<BBBBBIdd")
+
+ARRIVAL, PASS, LIGHT, PREEMPTION = range(1, 5)
+EVENT_NAMES = {ARRIVAL: "arrivée", PASS: "passage", LIGHT: "feux", PREEMPTION: "préemption"}
+MOVEMENTS = ["tout droit", "droite", "gauche"]
+
+
+# === Côté producteurs : un tampon et un thread d'écriture par processus ===
+class EventLog:
+    """Journal en ajout seul, partagé par tous les processus de la simulation.
+
+    Les événements sont empaquetés en mémoire ; un thread les écrit par lots toutes
+    les ``flush_interval`` secondes avec un seul ``write`` en mode O_APPEND, ce qui
+    garde chaque lot entier quand plusieurs processus écrivent dans le même fichier.
+    ``clock`` date les événements (``time.time`` en mode processus).
+    """
+
+    def __init__(self, path, plan="two-phase", flush_interval=0.2, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        with open(path, "wb") as f:
+            f.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, plan.encode()))
+        self._pid = None
+
+    def _start(self):
+        # Après un fork, chaque processus ouvre son propre descripteur et son propre thread
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+        # Écrire le dernier lot à la sortie du processus, y compris d'un processus fils
+        Finalize(self, self.close, exitpriority=10)
+
+    def _add(self, events):
+        if self._pid != os.getpid():
+            self._start()
+        with self._lock:
+            self._pending.append(events)
+
+    def arrivals(self, blob):
+        # Un événement par enregistrement de vehicle_record
+        self._add(b"".join(EVENT.pack(ARRIVAL, type_code, entry, exit_dir, priority, number, arrival, 0.0)
+                           for type_code, number, entry, exit_dir, priority, arrival in RECORD.iter_unpack(blob)))
+
+    def passes(self, blob):
+        now = self.clock()
+        self._add(b"".join(EVENT.pack(PASS, type_code, entry, exit_dir, priority, number, now, now - arrival)
+                           for type_code, number, entry, exit_dir, priority, arrival in RECORD.iter_unpack(blob)))
+
+    def light(self, phase, emergency_mode, emergency_direction):
+        # ``emergency_direction`` est un indice de DIR_INDEX (-1 hors urgence), journalisé en indice de DIRECTIONS
+        direction = DIRECTIONS.index(DIR_INDEX_REVERSE[emergency_direction]) if emergency_mode else 0
+        self._add(EVENT.pack(LIGHT, 0, direction, 0, emergency_mode, phase, self.clock(), 0.0))
+
+    def preemption(self, direction, plate_number, latency):
+        self._add(EVENT.pack(PREEMPTION, 1, DIRECTIONS.index(direction), 0, 0, plate_number, self.clock(), latency))
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            os.write(self._fd, b"".join(batch))
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self.flush()
+        self._closed = True
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+# === Côté lecteur : tableaux d'analyse hors ligne ===
+def read_events(path):
+    """Renvoie ``(plan, événements triés par instant)`` ; chaque événement est un tuple de ``EVENT``."""
+    with open(path, "rb") as f:
+        magic, version, plan = LOG_HEADER.unpack(f.read(LOG_HEADER.size))
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path} n'est pas un journal d'événements valide")
+        data = f.read()
+    usable = len(data) - len(data) % EVENT.size  # un dernier lot interrompu est ignoré
+    events = sorted(EVENT.iter_unpack(data[:usable]), key=lambda e: e[6])
+    return plan.rstrip(b"\0").decode(), events
+
+
+def _percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def analyze(path):
+    plan_name, events = read_events(path)
+    plan = PLANS[plan_name]
+    start = events[0][6] if events else 0.0
+    end = events[-1][6] if events else 0.0
+    duration = max(end - start, 1e-9)
+
+    passed = {(d, m): 0 for d in DIRECTIONS for m in MOVEMENTS}
+    waits = {}
+    phases = {}
+    arrivals = 0
+    current = None  # (nom de phase, début)
+    for kind, type_code, entry, _exit_dir, priority, ident, t, value in events:
+        if kind == ARRIVAL:
+            arrivals += 1
+        elif kind == PASS:
+            movement = MOVEMENTS[priority - 1]
+            passed[(DIRECTIONS[entry], movement)] += 1
+            group = "ambulance" if VEHICLE_TYPES[type_code] == "priority" else movement
+            waits.setdefault(group, []).append(value)
+        elif kind == LIGHT:
+            name = f"Urgence {DIRECTIONS[entry]}" if priority else plan[ident].name
+            if current is not None:
+                phases[current[0]] = phases.get(current[0], 0.0) + t - current[1]
+            current = (name, t)
+    if current is not None:
+        phases[current[0]] = phases.get(current[0], 0.0) + end - current[1]
+
+    throughput = {d: {m: {"passed": passed[(d, m)], "per_minute": round(passed[(d, m)] * 60 / duration, 2)}
+                      for m in MOVEMENTS} for d in DIRECTIONS}
+    wait_table = {}
+    for group, values in sorted(waits.items()):
+        values.sort()
+        wait_table[group] = {
+            "passed": len(values),
+            "mean_s": round(sum(values) / len(values), 3),
+            "p50_s": round(_percentile(values, 50), 3),
+            "p90_s": round(_percentile(values, 90), 3),
+            "p99_s": round(_percentile(values, 99), 3),
+            "max_s": round(values[-1], 3),
+        }
+    total_phase = sum(phases.values()) or 1e-9
+    utilization = {name: {"seconds": round(seconds, 1), "share": round(seconds / total_phase, 4)}
+                   for name, seconds in phases.items()}
+    return {"plan": plan_name, "duration_s": round(duration, 3), "events": len(events), "arrivals": arrivals,
+            "throughput": throughput, "waits": wait_table, "phase_utilization": utilization}
+
+
+def format_event(event):
+    # Sortie texte d'un événement (affichage optionnel du journal)
+    kind, type_code, entry, exit_dir, priority, ident, t, value = event
+    if kind in (ARRIVAL, PASS):
+        plate = f"{'AMB' if type_code else 'CAR'}-{ident:04d}"
+        line = f"{t:.3f} {EVENT_NAMES[kind]} {plate} {DIRECTIONS[entry]} → {DIRECTIONS[exit_dir]} ({MOVEMENTS[priority - 1]})"
+        return line + (f", attente {value:.3f} s" if kind == PASS else "")
+    if kind == LIGHT:
+        return f"{t:.3f} feux phase {ident}" + (f" (urgence {DIRECTIONS[entry]})" if priority else "")
+    return f"{t:.3f} préemption AMB-{ident:04d} {DIRECTIONS[entry]}, latence {value:.3f} s"
+
+
+def print_report(report):
+    print(f"Plan {report['plan']}, {report['events']} événements sur {report['duration_s']} s, "
+          f"{report['arrivals']} arrivées")
+    print("\nDébit par mouvement (véhicules passés, par minute) :")
+    print(f"{'entrée':<8}" + "".join(f"{m:>20}" for m in MOVEMENTS))
+    for d, row in report["throughput"].items():
+        print(f"{d:<8}" + "".join(f"{c['passed']:>12} {c['per_minute']:>7}" for c in row.values()))
+    print("\nAttentes (secondes) :")
+    print(f"{'groupe':<12}{'passés':>8}{'moyenne':>9}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}")
+    for group, w in report["waits"].items():
+        print(f"{group:<12}{w['passed']:>8}{w['mean_s']:>9}{w['p50_s']:>8}{w['p90_s']:>8}{w['p99_s']:>8}{w['max_s']:>8}")
+    print("\nUtilisation des phases :")
+    for name, u in sorted(report["phase_utilization"].items(), key=lambda item: -item[1]["seconds"]):
+        print(f"{name:<32}{u['seconds']:>10} s {100 * u['share']:>6.1f} %")
+
+
+def main():
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Analyse d'un journal d'événements de la simulation")
+    parser.add_argument("log", help="journal écrit avec ppc_projet.py --events")
+    parser.add_argument("--json", action="store_true", help="rapport au format JSON")
+    parser.add_argument("--dump", action="store_true", help="afficher chaque événement en texte")
+    args = parser.parse_args()
+    if args.dump:
+        for event in read_events(args.log)[1]:
+            print(format_event(event))
+        return
+    report = analyze(args.log)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
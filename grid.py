@@ -0,0 +1,201 @@
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+
+from constants import *
+from phase_plan import PLANS
+from right_of_way import needed_sections, resolve
+from section_store import SectionStore
+from vehicle_record import RECORD, RECORD_SIZE, TYPE_CODE, DIR_CODE
+
+# Sortie par un côté -> entrée par le côté opposé du carrefour voisin (décalage ligne, colonne)
+NEIGHBOR_OFFSET = {N: (-1, 0), S: (1, 0), W: (0, -1), E: (0, 1)}
+# Un transfert désigne le carrefour destinataire par deux octets (ligne, colonne)
+MAX_SIDE = 256
+RESULT_POLL = 1.0  # intervalle de vérification des processus de travail pendant l'attente des résultats
+
+
+# === Un carrefour de la grille : ses quatre sections, son feu et son coordinateur ===
+class Intersection:
+    def __init__(self, row, col, rng):
+        self.row, self.col = row, col
+        self.rng = rng
+        self.section_queues = {d: SectionStore() for d in DIRECTIONS}
+        # Décalage des phases pour que les feux d'un couloir ne changent pas tous ensemble
+        self.offset = (row + col) % 2
+        self.phase = PLANS["two-phase"][0]
+
+    def light_step(self, tick):
+        # light_controller : basculer NS / EW toutes les UPDATE_INTERVAL secondes
+        self.phase = PLANS["two-phase"][(tick // UPDATE_INTERVAL + self.offset) % 2]
+
+    def coordinator_step(self):
+        # coordinator : renvoie le bloc des véhicules qui ont traversé
+        protected, permissive = self.phase.protected, self.phase.permissive
+        blobs = {d: self.section_queues[d].snapshot(priorities)
+                 for d, priorities in needed_sections(protected, permissive).items()}
+        return b"".join(self.section_queues[d].remove_many(blob)
+                        for d, blob in resolve(blobs, protected, permissive).items())
+
+
+def route(rng, entry):
+    # Choisir la sortie au carrefour suivant (pas de demi-tour)
+    exit_dir = rng.choice([d for d in DIRECTIONS if d != entry])
+    return exit_dir, PRIORITY_MAP[entry][exit_dir]
+
+
+# === Processus de travail : un groupe de carrefours simulés au même pas de temps ===
+def neighbor_workers(worker_id, owner):
+    # Processus qui possèdent un carrefour adjacent à l'un de ceux de ``worker_id``
+    neighbors = set()
+    for (row, col), w in owner.items():
+        if w != worker_id:
+            continue
+        for dr, dc in NEIGHBOR_OFFSET.values():
+            target = (row + dr, col + dc)
+            if target in owner and owner[target] != worker_id:
+                neighbors.add(owner[target])
+    return sorted(neighbors)
+
+
+def grid_worker(worker_id, cells, owner, rows, cols, duration, arrival_rate, seed, inboxes, results):
+    rng = random.Random(f"{seed}-{worker_id}")
+    n_workers = len(inboxes)
+    # Seuls les processus voisins échangent des véhicules, donc des messages
+    neighbors = neighbor_workers(worker_id, owner)
+    intersections = {cell: Intersection(cell[0], cell[1], rng) for cell in cells}
+    next_plate = worker_id
+    stats = {"generated": 0, "crossings": 0, "exited": 0, "handoffs": 0, "batches": 0}
+    early = {}  # lots reçus en avance : pas de temps -> liste de lots
+
+    def deliver(blob):
+        # Chaque transfert : ligne et colonne du carrefour destinataire, puis l'enregistrement
+        for i in range(0, len(blob), 2 + RECORD_SIZE):
+            cell = (blob[i], blob[i + 1])
+            record = blob[i + 2:i + 2 + RECORD_SIZE]
+            intersections[cell].section_queues[DIRECTIONS[record[5]]].append(record)
+
+    for tick in range(duration):
+        # Arrivées du réseau aux bords de la grille
+        for (row, col), inter in intersections.items():
+            for entry in DIRECTIONS:
+                dr, dc = NEIGHBOR_OFFSET[entry]
+                if 0 <= row + dr < rows and 0 <= col + dc < cols:
+                    continue
+                if rng.random() < arrival_rate:
+                    exit_dir, priority = route(rng, entry)
+                    inter.section_queues[entry].append(RECORD.pack(
+                        TYPE_CODE["normal"], next_plate, DIR_CODE[entry], DIR_CODE[exit_dir], priority, tick))
+                    next_plate += n_workers
+                    stats["generated"] += 1
+
+        # Feux puis coordinateurs, et préparation des lots sortants par processus destinataire
+        outgoing = [[] for _ in range(n_workers)]
+        for (row, col), inter in intersections.items():
+            inter.light_step(tick)
+            passed = inter.coordinator_step()
+            for i in range(0, len(passed), RECORD_SIZE):
+                stats["crossings"] += 1
+                type_code, plate, _, exit_code, _, arrival = RECORD.unpack_from(passed, i)
+                exit_side = DIRECTIONS[exit_code]
+                dr, dc = NEIGHBOR_OFFSET[exit_side]
+                target = (row + dr, col + dc)
+                if not (0 <= target[0] < rows and 0 <= target[1] < cols):
+                    stats["exited"] += 1
+                    continue
+                entry = OPPOSITE_DIR[exit_side]
+                next_exit, priority = route(rng, entry)
+                outgoing[owner[target]].append(bytes(target) + RECORD.pack(
+                    type_code, plate, DIR_CODE[entry], DIR_CODE[next_exit], priority, arrival))
+                stats["handoffs"] += 1
+
+        # Un seul message par processus voisin et par pas de temps (vide si aucun transfert)
+        for other in neighbors:
+            inboxes[other].put((tick, b"".join(outgoing[other])))
+            stats["batches"] += 1
+        received = [b"".join(outgoing[worker_id])] + early.pop(tick, [])
+        while len(received) < 1 + len(neighbors):
+            msg_tick, blob = inboxes[worker_id].get()
+            if msg_tick == tick:
+                received.append(blob)
+            else:
+                early.setdefault(msg_tick, []).append(blob)
+        # Les véhicules transférés rejoignent leur nouvelle section pour le pas suivant
+        for blob in received:
+            deliver(blob)
+
+    stats["waiting"] = sum(q.size() for inter in intersections.values() for q in inter.section_queues.values())
+    results.put(stats)
+
+
+def _next_result(results, processes):
+    # Attendre le bilan suivant sans bloquer indéfiniment si un processus de travail est mort
+    while True:
+        try:
+            return results.get(timeout=RESULT_POLL)
+        except queue.Empty:
+            failed = [p for p in processes if p.exitcode not in (None, 0)]
+            if failed:
+                raise RuntimeError(f"Processus de la grille arrêté (code de sortie {failed[0].exitcode})")
+
+
+def run_grid(rows, cols, duration, arrival_rate=0.5, seed=0, workers=None):
+    """Simule une grille rows x cols de carrefours pendant ``duration`` secondes virtuelles."""
+    if not (1 <= rows <= MAX_SIDE and 1 <= cols <= MAX_SIDE):
+        raise ValueError(f"La grille doit compter entre 1 et {MAX_SIDE} lignes et colonnes ({rows}x{cols})")
+    cells = [(r, c) for r in range(rows) for c in range(cols)]
+    n_workers = max(1, min(workers or os.cpu_count() or 1, len(cells)))
+    # Blocs contigus (ordre ligne par ligne) pour garder les voisins dans le même processus
+    owner = {cell: k * n_workers // len(cells) for k, cell in enumerate(cells)}
+    inboxes = [mp.Queue() for _ in range(n_workers)]
+    results = mp.Queue()
+    processes = [
+        mp.Process(target=grid_worker, args=(w, [c for c in cells if owner[c] == w], owner,
+                                             rows, cols, duration, arrival_rate, seed, inboxes, results))
+        for w in range(n_workers)
+    ]
+    start = time.monotonic()
+    for p in processes:
+        p.start()
+    totals = {}
+    try:
+        for _ in processes:
+            for key, value in _next_result(results, processes).items():
+                totals[key] = totals.get(key, 0) + value
+    except RuntimeError:
+        # Un processus mort bloquerait ses voisins à son prochain échange : tout arrêter
+        for p in processes:
+            p.terminate()
+        raise
+    for p in processes:
+        p.join()
+    totals["workers"] = n_workers
+    totals["elapsed"] = time.monotonic() - start
+    return totals
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Simulation d'un couloir urbain : grille de carrefours")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("--duration", type=int, default=3600, help="secondes virtuelles à simuler")
+    parser.add_argument("--rate", type=float, default=0.5,
+                        help="probabilité d'arrivée par seconde sur chaque entrée en bord de grille")
+    parser.add_argument("--workers", type=int, default=None, help="nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not (1 <= args.rows <= MAX_SIDE and 1 <= args.cols <= MAX_SIDE):
+        parser.error(f"--rows et --cols doivent être compris entre 1 et {MAX_SIDE}")
+    totals = run_grid(args.rows, args.cols, args.duration, args.rate, args.seed, args.workers)
+    print(f"Grille {args.rows}x{args.cols} : {args.duration} s simulées en {totals['elapsed']:.2f} s "
+          f"avec {totals['workers']} processus")
+    print(f"Véhicules générés : {totals['generated']}, passages de carrefour : {totals['crossings']}, "
+          f"sortis de la grille : {totals['exited']}, en attente : {totals['waiting']}")
+    print(f"Transferts entre carrefours : {totals['handoffs']} véhicules en {totals['batches']} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import json
+import multiprocessing as mp
+import struct
+import time
+from collections import deque
+
+from constants import *
+from vehicle_record import DIR_CODE, TYPE_CODE, VEHICLE_TYPES
+
+# === Indicateurs (KPI) : compteurs en mémoire partagée, un bloc par processus écrivain ===
+# Chaque processus n'écrit que dans son propre bloc, sans verrou ; l'agrégateur additionne les blocs
+ROLES = ["main", "coordinator", "generator", "ambulance"]
+MOVEMENTS = ["straight", "right", "left"]  # priorité de mouvement 1, 2, 3
+
+# Histogramme des attentes (millisecondes), log-linéaire à la manière de HDR : valeurs exactes
+# jusqu'à 16 ms, puis 8 seaux par puissance de 2 (erreur relative ≤ 12,5 %), jusqu'à ~2 h
+SUB_BUCKETS = 8
+HIST_BUCKETS = 168
+
+# Disposition d'un bloc de compteurs (entiers 64 bits)
+GENERATED = 0  # [classe][entrée]
+PASSED = GENERATED + 2 * 4  # [classe][entrée][mouvement]
+WAIT_SUM_MS = PASSED + 2 * 4 * 3  # [classe]
+WAIT_HIST = WAIT_SUM_MS + 2  # [classe][seau]
+BLOCK_SIZE = WAIT_HIST + 2 * HIST_BUCKETS
+
+# Derniers KPI publiés par l'agrégateur : séquence (seqlock), longueur, puis JSON
+_PUBLISHED = struct.Struct("<QI")
+PUBLISH_SIZE = 16384
+WINDOWS = (1, 10, 60)  # fenêtres glissantes (secondes)
+
+
+def bucket(ms):
+    if ms < 2 * SUB_BUCKETS:
+        return ms
+    shift = ms.bit_length() - 4
+    return min(HIST_BUCKETS - 1, shift * SUB_BUCKETS + (ms >> shift))
+
+
+def bucket_upper(index):
+    # Plus grande valeur (ms) comptée dans le seau ``index``
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+class Metrics:
+    """Compteurs de véhicules générés et passés, et histogrammes d'attente.
+
+    Chaque processus appelle ``bind`` avec son rôle au démarrage, puis met à jour
+    son bloc sans verrou. ``aggregator`` publie les fenêtres glissantes que le
+    display et le banc de mesure lisent avec ``read``.
+    """
+
+    def __init__(self):
+        self.blocks = [mp.RawArray('q', BLOCK_SIZE) for _ in ROLES]
+        self.block = self.blocks[0]
+        self.published = mp.RawArray('B', _PUBLISHED.size + PUBLISH_SIZE)
+
+    def bind(self, role):
+        self.block = self.blocks[ROLES.index(role)]
+
+    def generated(self, entry, vehicle_type="normal", count=1):
+        self.block[GENERATED + TYPE_CODE[vehicle_type] * 4 + DIR_CODE[entry]] += count
+
+    def passed(self, vehicle, wait):
+        block, cls = self.block, TYPE_CODE[vehicle['type']]
+        block[PASSED + (cls * 4 + DIR_CODE[vehicle['entry']]) * 3 + vehicle['priority'] - 1] += 1
+        ms = max(0, int(wait * 1000))
+        block[WAIT_SUM_MS + cls] += ms
+        block[WAIT_HIST + cls * HIST_BUCKETS + bucket(ms)] += 1
+
+    def totals(self):
+        # Somme des blocs de tous les processus
+        return [sum(values) for values in zip(*(block[:] for block in self.blocks))]
+
+    def publish(self, kpis):
+        data = json.dumps(kpis).encode()[:PUBLISH_SIZE]
+        buf = self.published
+        seq = _PUBLISHED.unpack_from(buf)[0]
+        _PUBLISHED.pack_into(buf, 0, seq + 1, len(data))
+        buf[_PUBLISHED.size:_PUBLISHED.size + len(data)] = data
+        _PUBLISHED.pack_into(buf, 0, seq + 2, len(data))
+
+    def read(self):
+        """Derniers KPI publiés (None avant la première publication), lecture sans verrou."""
+        buf = self.published
+        while True:
+            seq, length = _PUBLISHED.unpack_from(buf)
+            if seq % 2:
+                continue  # publication en cours
+            data = bytes(buf[_PUBLISHED.size:_PUBLISHED.size + length])
+            if _PUBLISHED.unpack_from(buf)[0] == seq:
+                return json.loads(data) if seq else None
+
+
+def _percentile(hist, total, p):
+    rank = p / 100 * total
+    seen = 0
+    for index, count in enumerate(hist):
+        seen += count
+        if count and seen >= rank:
+            return bucket_upper(index) / 1000
+    return None
+
+
+def window_kpis(newer, older, seconds):
+    """KPI entre deux relevés de ``Metrics.totals`` séparés de ``seconds`` secondes."""
+    delta = [a - b for a, b in zip(newer, older)]
+    passed = delta[PASSED:WAIT_SUM_MS]
+    kpis = {
+        "seconds": round(seconds, 3),
+        "generated": sum(delta[GENERATED:PASSED]),
+        "passed": sum(passed),
+        "throughput_vps": round(sum(passed) / seconds, 3) if seconds > 0 else None,
+        "passed_by_direction": {d: sum(passed[c * 12 + DIR_CODE[d] * 3 + m] for c in range(2) for m in range(3))
+                                for d in DIRECTIONS},
+        "passed_by_movement": {name: sum(passed[i::3]) for i, name in enumerate(MOVEMENTS)},
+        "wait_s": {},
+    }
+    for cls, name in enumerate(VEHICLE_TYPES):
+        hist = delta[WAIT_HIST + cls * HIST_BUCKETS:WAIT_HIST + (cls + 1) * HIST_BUCKETS]
+        count = sum(hist)
+        kpis["wait_s"][name] = {
+            "passed": count,
+            "mean": round(delta[WAIT_SUM_MS + cls] / count / 1000, 3) if count else None,
+            "p50": _percentile(hist, count, 50),
+            "p95": _percentile(hist, count, 95),
+            "p99": _percentile(hist, count, 99),
+        }
+    return kpis
+
+
+# === Processus agrégateur : fenêtres glissantes de 1 s, 10 s et 60 s ===
+def aggregate(metrics, history, start, interval=1.0, windows=WINDOWS):
+    # Un relevé : ajouter les totaux à ``history`` (instant, totaux) et publier les fenêtres
+    now = time.monotonic()
+    totals = metrics.totals()
+    history.append((now, totals))
+    kpis = {"uptime_s": round(now - start, 1), "total": window_kpis(totals, [0] * BLOCK_SIZE, now - start)}
+    for window in windows:
+        # Le plus récent relevé au moins ``window`` secondes avant celui-ci (ou le plus ancien)
+        then, older = next(((t, v) for t, v in reversed(history) if now - t >= window - interval / 2),
+                           history[0])
+        kpis[f"{window}s"] = window_kpis(totals, older, now - then)
+    metrics.publish(kpis)
+
+
+def aggregator(metrics, interval=1.0, windows=WINDOWS):
+    history = deque(maxlen=int(max(windows) / interval) + 1)
+    start = time.monotonic()
+    deadline = start
+    while True:
+        aggregate(metrics, history, start, interval, windows)
+        deadline += interval
+        time.sleep(max(0.0, deadline - time.monotonic()))
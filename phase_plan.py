@@ -0,0 +1,87 @@
+from constants import *
+
+STRAIGHT, RIGHT, LEFT = 1, 2, 3
+
+
+# === Masques de mouvements : 3 bits par approche (tout droit, droite, gauche) ===
+def movement_bit(entry, priority):
+    return 1 << (DIR_INDEX[entry] * 3 + priority - 1)
+
+
+def movements(entries, priorities):
+    mask = 0
+    for entry in entries:
+        for priority in priorities:
+            mask |= movement_bit(entry, priority)
+    return mask
+
+
+def approach_bits(mask, entry):
+    # Les 3 bits d'une approche, bit 0 = tout droit
+    return (mask >> (DIR_INDEX[entry] * 3)) & 0b111
+
+
+class Phase:
+    """Une phase du plan de feux.
+
+    ``protected`` : mouvements autorisés sans condition ; ``permissive`` : mouvements
+    autorisés en cédant le passage au trafic opposé qui va tout droit.
+    ``duration`` fixe la durée de la phase (None : durée choisie par la politique) ;
+    une phase de dégagement (``clearance``) tient toujours sa durée.
+    """
+
+    def __init__(self, name, protected=0, permissive=0, duration=None, clearance=False):
+        self.name = name
+        self.protected = protected
+        self.permissive = permissive
+        self.duration = duration
+        self.clearance = clearance
+
+    def lights(self):
+        # Feu d'une approche : vert dès qu'un de ses mouvements est autorisé
+        allowed = self.protected | self.permissive
+        lights = [LIGHT_RED] * 4
+        for d in DIRECTIONS:
+            if approach_bits(allowed, d):
+                lights[DIR_INDEX[d]] = LIGHT_GREEN
+        return lights
+
+
+ALL_RED = 2  # durée du dégagement tout rouge (secondes)
+LEFT_GREEN = 4  # durée d'une phase de tourne-à-gauche protégé (secondes)
+
+
+def _through(axis):
+    return Phase(f"{axis[0]}-{axis[1]} tout droit / droite", protected=movements(axis, [STRAIGHT, RIGHT]))
+
+
+def _left(axis):
+    return Phase(f"{axis[0]}-{axis[1]} gauche protégée", protected=movements(axis, [LEFT]), duration=LEFT_GREEN)
+
+
+def _all_red():
+    return Phase("Tout rouge", duration=ALL_RED, clearance=True)
+
+
+PLANS = {
+    # Plan d'origine : NS puis EW, les tourne-à-gauche cèdent le passage au trafic d'en face
+    "two-phase": [
+        Phase(f"{N}-{S}", protected=movements([N, S], [STRAIGHT, RIGHT]), permissive=movements([N, S], [LEFT])),
+        Phase(f"{E}-{W}", protected=movements([E, W], [STRAIGHT, RIGHT]), permissive=movements([E, W], [LEFT])),
+    ],
+    # Gauches protégées avant le tout droit de chaque axe
+    "leading-left": [
+        _left([N, S]), _through([N, S]), _all_red(),
+        _left([E, W]), _through([E, W]), _all_red(),
+    ],
+    # Gauches protégées après le tout droit de chaque axe
+    "lagging-left": [
+        _through([N, S]), _left([N, S]), _all_red(),
+        _through([E, W]), _left([E, W]), _all_red(),
+    ],
+}
+
+
+def emergency_phase(direction):
+    # Toute l'approche de l'ambulance passe, tout le reste est au rouge
+    return Phase(f"Urgence {direction}", protected=movements([direction], [STRAIGHT, RIGHT, LEFT]))
@@ -1,82 +1,161 @@
+import asyncio
 import multiprocessing as mp
 import random
 import time
-import socket
 import sys
 import os
+import selectors
 import signal
+from collections import namedtuple
+
+from constants import *
+from scheduler import EventScheduler
+from section_store import SectionManager, SectionStore
+from section_ring import RingSection, SectionRing, producer_sections
+from display_channel import get_display_channel, start_display_listener
+from terminal_view import TerminalRenderer
+from recent_events import EMERGENCY, NORMAL, RecentEvents, record_severity
+from vehicle_record import RECORD, RECORD_SIZE, TYPE_CODE, pack_vehicle, unpack_many, unpack_vehicle
+from workload import read_trace, stamp, trace_time
+from right_of_way import needed_sections, resolve
+from phase_plan import PLANS, emergency_phase
+from preemption import PREEMPTION_POLL, EmergencyPipe, PreemptionTable
+from metrics import BLOCK_SIZE, WINDOWS, Metrics, aggregate, aggregator, window_kpis
+from event_log import EventLog
+from signal_policy import FixedTimePolicy, QueueDetector, make_policy
 
-# === Constantes ===
-N = "North"
-S = "South"
-W = "West"
-E = "East"
-DIRECTIONS = [N, S, W, E]
-LIGHT_GREEN = 1
-LIGHT_RED = 0
-UPDATE_INTERVAL = 8  # Intervalle de mise à jour des feux en mode normal (secondes)
 
-# Indexation des directions pour un accès plus facile
-DIR_INDEX = {N: 0, S: 1, E: 2, W: 3}
-DIR_INDEX_REVERSE = {v: k for k, v in DIR_INDEX.items()}
+# === Feux de signalisation (mémoire partagée) ===
+# Disposition du bloc partagé : [séquence, feux N/S/E/W, mode urgence, direction d'urgence,
+# nombre d'urgences, indice de phase, masque des mouvements protégés, masque des mouvements permissifs]
+SEQ = 0
+LIGHTS = slice(1, 5)
+EMERGENCY_MODE = 5
+EMERGENCY_DIRECTION = 6
+EMERGENCY_COUNT = 7
+PHASE = 8
+PROTECTED = 9
+PERMISSIVE = 10
 
-# Direction opposée (utilisée pour gérer les véhicules tournant à gauche en attente)
-OPPOSITE_DIR = {
-    N: S, S: N,
-    E: W, W: E
-}
+LightState = namedtuple("LightState", "lights emergency_mode emergency_direction emergency_count "
+                                      "phase protected permissive")
 
 
-# === Feux de signalisation (mémoire partagée) ===
 class TrafficLight:
-    def __init__(self):
-        # Un tableau de mémoire partagée pour stocker l'état des feux dans les quatre directions
-        # accessible par le processus coordinator
-        self.light_states = mp.Array('i', [LIGHT_GREEN, LIGHT_GREEN, LIGHT_RED, LIGHT_RED])
-        self.emergency_mode = mp.Value('b', False)
-        self.emergency_direction = mp.Value('i', -1)
-        self.emergency_count = mp.Value('i', 0)
+    def __init__(self, plan="two-phase"):
+        # Un bloc de mémoire partagée pour stocker l'état des feux dans les quatre directions
+        # accessible par le processus coordinator.
+        # Seqlock : les écrivains (sous self.lock) rendent la séquence impaire pendant l'écriture,
+        # les lecteurs ne prennent aucun verrou et recommencent si la séquence a bougé
+        self.plan = PLANS[plan]
+        first = self.plan[0]
+        self.state = mp.RawArray('i', [0, *first.lights(), False, -1, 0, 0, first.protected, first.permissive])
         self.lock = mp.Lock()
+        # Compteurs d'arrivées (sous self.lock) et de départs (écrits par le seul coordinateur)
+        # par section : ils donnent la longueur des files aux politiques de feux, et les arrivées,
+        # avec la séquence, réveillent le coordinateur qui attend sur la condition
+        self.arrivals = mp.RawArray('i', 4)
+        self.departures = mp.RawArray('i', 4)
+        self.changed = mp.Condition(self.lock)
+        # Ambulances en attente de préemption, sur une ou plusieurs approches
+        self.preemption = PreemptionTable()
+        # Compteurs de KPI (véhicules générés / passés, histogrammes d'attente), un bloc par processus
+        self.metrics = Metrics()
+        # Journal binaire des événements (event_log.EventLog), facultatif
+        self.events = None
+        # Anneau des véhicules passés pour le visualiseur (section_ring.SectionRing), facultatif
+        self.passes = None
+
+    def read_state(self):
+        """Lecture sans verrou d'un ``LightState`` cohérent."""
+        state = self.state
+        while True:
+            seq = state[SEQ]
+            if seq % 2:
+                continue  # écriture en cours
+            snapshot = state[1:]
+            if state[SEQ] == seq:
+                return LightState(snapshot[:4], bool(snapshot[4]), *snapshot[5:])
 
     def get_light_state(self, direction):
-        with self.lock:
-            return self.light_states[DIR_INDEX[direction]]
-
-    def print_light_states(self):
+        return self.read_state().lights[DIR_INDEX[direction]]
+
+    def current_phase(self):
+        return self.plan[self.read_state().phase]
+
+    def generations(self):
+        return self.state[SEQ], sum(self.arrivals)
+
+    def wait_for_change(self, seen, timeout=None):
+        # Bloque jusqu'à un changement de feux ou une arrivée de véhicule depuis ``seen``
+        with self.changed:
+            self.changed.wait_for(lambda: self.generations() != seen, timeout)
+            return self.generations()
+
+    def notify_arrival(self, direction, count=1):
+        with self.changed:
+            self.arrivals[DIR_INDEX[direction]] += count
+            self.changed.notify_all()
+
+    def record_departures(self, direction, count):
+        self.departures[DIR_INDEX[direction]] += count
+
+    def _write(self, phase, index, emergency_mode, emergency_direction, emergency_count):
+        # À appeler en tenant self.lock : publie un nouvel état complet et réveille les lecteurs
+        state = self.state
+        state[SEQ] += 1
+        state[LIGHTS] = phase.lights()
+        state[EMERGENCY_MODE] = emergency_mode
+        state[EMERGENCY_DIRECTION] = emergency_direction
+        state[EMERGENCY_COUNT] = emergency_count
+        state[PHASE] = index
+        state[PROTECTED] = phase.protected
+        state[PERMISSIVE] = phase.permissive
+        state[SEQ] += 1
+        self.changed.notify_all()
+        if self.events is not None:
+            self.events.light(index, emergency_mode, emergency_direction)
+
+    def log_events(self, events):
+        # Attache le journal et y inscrit l'état courant, point de départ de l'utilisation des phases
+        self.events = events
+        state = self.read_state()
+        events.light(state.phase, state.emergency_mode, state.emergency_direction)
+
+    def light_states(self):
+        lights = self.read_state().lights
         states = []
         for d in DIRECTIONS:
-            state = "Vert" if self.light_states[DIR_INDEX[d]] == LIGHT_GREEN else "Rouge"
+            state = "Vert" if lights[DIR_INDEX[d]] == LIGHT_GREEN else "Rouge"
             states.append(f"{d}:{state}")
-        print(f"État actuel des feux：{', '.join(states)}")
+        return f"État actuel des feux：{', '.join(states)}"
+
+    def print_light_states(self):
+        print(self.light_states())
 
-    def set_normal_state(self, ns_green, we_green):
+    def set_phase(self, index):
+        phase = self.plan[index]
         with self.lock:
-            self.light_states[DIR_INDEX[N]] = ns_green
-            self.light_states[DIR_INDEX[S]] = ns_green
-            self.light_states[DIR_INDEX[E]] = we_green
-            self.light_states[DIR_INDEX[W]] = we_green
-            self.emergency_mode.value = False
-            self.emergency_direction.value = -1
-        print(f"Changement des feux - {N} et {S}sont {'Verts' if ns_green else 'Rouges'}，{E} et {W} sont {'Verts' if we_green else 'Rougs'}")
+            self._write(phase, index, False, -1, self.state[EMERGENCY_COUNT])
+        print(f"Changement des feux - phase {phase.name}")
+
+    def next_phase(self):
+        # Passer à la phase suivante du plan (après une urgence : reprendre le plan où il en était)
+        self.set_phase((self.read_state().phase + 1) % len(self.plan))
 
     def enter_emergency_mode(self, direction):
+        dir_index = DIR_INDEX[direction]
+        # Met tous les feux au rouge sauf la direction d'urgence
         with self.lock:
-            dir_index = DIR_INDEX[direction]
-            # Met tous les feux au rouge sauf la direction d'urgence
-            for i in range(4):
-                self.light_states[i] = LIGHT_RED
-            self.light_states[dir_index] = LIGHT_GREEN
-            self.emergency_mode.value = True
-            self.emergency_direction.value = dir_index
-            self.emergency_count.value += 1
-        print("\n!!! 🚑 Mode urgence activé ---")
+            self._write(emergency_phase(direction), self.state[PHASE], True, dir_index,
+                        self.state[EMERGENCY_COUNT] + 1)
+        self.preemption.started()
+        print(f"\n!!! 🚑 Mode urgence activé : {direction} ---")
         
         self.print_light_states()
 
     def exit_emergency_mode(self):
-        with self.lock:
-            self.emergency_mode.value = False
-        self.set_normal_state(LIGHT_GREEN, LIGHT_RED)
+        self.set_phase(self.read_state().phase)
         print("\n!!! Mode urgence désactivé, retour à la normale !!!")
         self.print_light_states()
 
@@ -89,6 +168,13 @@ def generate_license_plate():
         return f"CAR-{global_car_id.value:04d}"
 
 
+def reserve_license_plates(count):
+    # Réserver un bloc de numéros de plaque en une seule prise du verrou, renvoie le premier
+    with global_car_id.get_lock():
+        global_car_id.value += count
+        return global_car_id.value - count + 1
+
+
 global_amb_id = mp.Value('i', 0)
 
 
@@ -101,213 +187,641 @@ def generate_ambulance_plate():
 def vehicle_priority(entry, exit_dir):
     # Définition des priorités : 
     # Ambulance(de type "priority" dans le dictionnaire des voitures) > Tout droit (1) > Droite (2) > Gauche (3)
-    priority_map = {
-        N: {S: 1, W: 2, E: 3},
-        S: {N: 1, E: 2, W: 3},
-        E: {W: 1, N: 2, S: 3},
-        W: {E: 1, S: 2, N: 3}
-    }
-    return priority_map[entry][exit_dir]
+    return PRIORITY_MAP[entry][exit_dir]
 
 
 # === Communication par socket ：display ===
 DISPLAY_PORT = 65432
 
 
-def display_server(traffic_light, section_queues, msg_queue):
-    from threading import Thread, Lock
-    log_messages = []
-    log_lock = Lock()
-
-    def handle_connection(conn, addr):
-        with conn:
-            data = conn.recv(1024)
-            if data:
-                message = data.decode()
-                with log_lock:
-                    log_messages.append(message)
-                    # Ne conserver que les 10 derniers messages
-                    if len(log_messages) > 10:
-                        log_messages.pop(0)
-
-    def socket_listener():
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.bind(("localhost", DISPLAY_PORT))
-        server_socket.listen(5)
-        print("Le serveur Display attend la connexion...")
+def display_lines(traffic_light, section_queues, msg_queue, recent, view):
+    """Lignes d'un écran du display.
+
+    ``view`` garde d'un écran à l'autre la dernière copie de chaque file et la dernière alerte.
+    """
+    lines = ["=" * 50, "Simulation de traffic en temps réel".center(50), "=" * 50]
+
+    #【Mémoire partagée】État des feux de signalisation
+    lines += ["", " 【Mémoire partagée】État des feux de signalisation : ", traffic_light.light_states()]
+
+    # Afficher les queues pour chaque direction
+    lines += ["", "【Queues】"]
+    # Lecture non destructive : la copie publiée n'est retransférée que si la file a changé
+    queue_views = view.setdefault("queues", {d: (-1, [], 0) for d in section_queues})
+    for direction, queue in section_queues.items():
+        version, vehicles, count = queue.view(queue_views[direction][0])
+        if vehicles is not None:
+            # Seul le début de la file tient sur la ligne : le coût de l'écran ne suit pas la longueur des files
+            queue_views[direction] = (version, [v['license_plate'] for v in unpack_many(vehicles[:40 * RECORD_SIZE])],
+                                      count)
+        _version, plates, count = queue_views[direction]
+        lines.append(f"Direction {direction} ({count}): {', '.join(plates)}")
+
+    #【Mémoire partagée】Ambulances en attente de préemption, par échéance
+    report = traffic_light.preemption.report()
+    pending = ", ".join(f"{plate} ({direction})" for _, direction, plate, _ in traffic_light.preemption.pending())
+    lines += ["", f"【Préemption】En attente : {pending or 'aucune'} ; servies : {report['served']} "
+                  f"en {report['preemptions']} préemptions, latence moyenne {report['latency_mean_s']} s, "
+                  f"max {report['latency_max_s']} s"]
+
+    #【Mémoire partagée】KPI publiés par l'agrégateur
+    kpis = traffic_light.metrics.read()
+    if kpis:
+        lines += ["", "【KPI】"]
+        for window in ("1s", "10s", "60s"):
+            k, wait = kpis[window], kpis[window]["wait_s"]["normal"]
+            by_direction = ", ".join(f"{d} {n}" for d, n in k["passed_by_direction"].items())
+            lines.append(f"{window:>4} : {k['throughput_vps']} véh/s ({by_direction}), "
+                         f"attente p50 {wait['p50']} s, p95 {wait['p95']} s")
+
+    # Afficher les nouveaux messages d'une queue
+    # Derniers messages reçus ; ceux des urgences sont gardés à part pour ne pas être chassés par les passages.
+    # Les véhicules passés arrivent en enregistrements binaires, mis en texte ici seulement
+    def text(message):
+        return message if isinstance(message, str) else pass_message(unpack_vehicle(message))
+
+    lines += ["", "【Communication par socket】Dernières urgences :", *map(text, recent.snapshot(EMERGENCY))]
+    lines += ["", "【Communication par socket】Dernier message :", *map(text, recent.snapshot(NORMAL))]
+
+    # Alerte si un véhicule d'urgence arrive : elle reste affichée jusqu'à la suivante
+    while not msg_queue.empty():
+        view["alert"] = msg_queue.get()
+    if view.get("alert"):
+        lines += ["", f"!!! Véhicule d'urgence arrive：{view['alert']} !!!"]
+    return lines
+
+
+def display_server(traffic_light, section_queues, msg_queue, fps=4.0):
+    # Un seul écrivain, la boucle réseau : ajout sans verrou, le rendu lit des copies cohérentes
+    recent = RecentEvents()
+
+    # Démarrer le thread d'écoute : une seule boucle pour toutes les connexions
+    print("Le serveur Display attend la connexion...")
+    start_display_listener("localhost", DISPLAY_PORT, recent.append)
+    renderer = TerminalRenderer(fps=fps)
+    view = {}
+
+    # Mise à jour de l'affichage de l'interface, au plus ``fps`` écrans par seconde,
+    # en ne réécrivant que ce qui a changé
+    try:
         while True:
-            try:
-                conn, addr = server_socket.accept()
-                Thread(target=handle_connection, args=(conn, addr), daemon=True).start()
-            except Exception as e:
-                print("Exception de socket_listener :", e)
-
-    # Démarrer le thread d'écoute 
-    listener_thread = Thread(target=socket_listener, daemon=True)
-    listener_thread.start()
+            renderer.draw(display_lines(traffic_light, section_queues, msg_queue, recent, view))
+            time.sleep(renderer.min_interval)
+    finally:
+        renderer.close()
 
-    # Mise à jour périodique de l'affichage de l'interface
-    while True:
-        # Effacer l'écran
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print("=" * 50)
-        print("Simulation de traffic en temps réel".center(50))
-        print("=" * 50)
-
-        #【Mémoire partagée】État des feux de signalisation
-        print("\n 【Mémoire partagée】État des feux de signalisation : ")
-        traffic_light.print_light_states()
-
-        # Afficher les queues pour chaque direction
-        print("\n【Queues】")
-        for direction, queue in section_queues.items():
-            queue_str = ", ".join([v['license_plate'] for v in queue])
-            print(f"Direction {direction}: {queue_str}")
-
-        # Afficher les nouveaux messages d'une queue
-        print("\n【Communication par socket】Dernier message :")
-        with log_lock:
-            for msg in log_messages:
-                print(msg)
-
-        # Alerte si un véhicule d'urgence arrive
-        if not msg_queue.empty():
-            emergency_msg = msg_queue.get()
-            print(f"\n!!! Véhicule d'urgence arrive：{emergency_msg} !!!")
-        time.sleep(1)
-
-
-def send_to_display(message, msg_queue):
-    try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect(("localhost", DISPLAY_PORT))
-        client_socket.sendall(message.encode())
-        client_socket.close()
-    except ConnectionRefusedError:
-        print("Serveur de Display indisponible, réessai en cours...")
 
-    # Envoyer le message d'arrivée d'un véhicule d'urgence à la queue d'affichage
-    msg_queue.put(message)
+def send_to_display(message, msg_queue, level=NORMAL):
+    # Connexion persistante du processus courant, envoyée par lots. ``msg_queue`` ne reçoit
+    # que les alertes d'arrivée des véhicules d'urgence (ambulance_arrival) : y recopier chaque
+    # message ferait croître le travail du display avec le débit de véhicules.
+    # ``level`` : EMERGENCY pour les messages gardés à part par le display (ambulances, préemptions)
+    get_display_channel("localhost", DISPLAY_PORT).send(message, level)
 
 
 # === Lights: Processus de gestion des feux de signalisation ===
-def light_controller(traffic_light, emergency_event, msg_queue, emergency_flag):
+def preemption_step(traffic_light, notify):
+    """Sert la table des préemptions ; renvoie True si elle a fixé les feux à cette étape.
+
+    Le vert va à l'approche de l'ambulance dont l'échéance est la plus proche, et y
+    reste tant qu'une ambulance de cette approche attend ; la table vide, le plan
+    reprend à la phase interrompue.
+    """
+    state = traffic_light.read_state()
+    direction = traffic_light.preemption.next_direction()
+    if direction is None:
+        if not state.emergency_mode:
+            return False
+        traffic_light.exit_emergency_mode()
+        notify(f"Fin de la préemption, reprise de la phase {traffic_light.current_phase().name}", EMERGENCY)
+        return True
+    if not state.emergency_mode or state.emergency_direction != DIR_INDEX[direction]:
+        traffic_light.enter_emergency_mode(direction)
+        notify(f"Préemption des feux pour les véhicules d'urgence venant de {direction}", EMERGENCY)
+    return True
+
+
+def light_step(traffic_light, emergency_event, notify, last_state):
+    # Une étape du contrôleur des feux, renvoie le dernier état connu des feux
+    if emergency_event.is_set():
+        # Lorsqu'un événement d'urgence est reçu, servir la table des préemptions
+        emergency_event.clear()  # Réinitialiser le drapeau d'événement pour éviter une réactivation
+        if traffic_light.preemption.next_direction() is None and not traffic_light.read_state().emergency_mode:
+            # Aucune ambulance en attente (déjà passée au vert, ou simple signal) : la phase en cours continue
+            return last_state
+        print("light_controller détecte un événement d'urgence, basculement en mode d'urgence.")  # Sortie de débogage pour confirmer le déclenchement de l'événement
+        notify("Véhicule d'urgence arrivé, changement des feux de signalisation", EMERGENCY)  # Envoyer le message d'événement d'urgence à l'afficheur
+        preemption_step(traffic_light, notify)
+        return last_state
+    if preemption_step(traffic_light, notify):
+        return last_state
+    # En mode normal:
+    # passer régulièrement à la phase suivante du plan de feux
+    traffic_light.next_phase()
+    # Si l'état a changé, envoyer une mise à jour
+    lights = traffic_light.read_state().lights
+    if last_state != lights:
+        notify(f"Traffic light updated: phase {traffic_light.current_phase().name}  {lights} (Rouge==0 et Vert==1)")
+        last_state = lights
+        traffic_light.print_light_states()  # Afficher les nouveaux états des feux de signalisation
+    return last_state
+
+
+def policy_step(traffic_light, policy, detector, emergency_event, notify, last_state, green_since, now):
+    # Une étape du light_controller piloté par une politique de feux,
+    # renvoie le dernier état connu des feux et le début de la phase verte en cours
+    detector.sample(now)
+    state = traffic_light.read_state()
+    if emergency_event.is_set() or state.emergency_mode:
+        # Préemption : la politique ne décide pas, la phase reprise repart pour une durée complète
+        last_state = light_step(traffic_light, emergency_event, notify, last_state)
+        if not state.emergency_mode and not traffic_light.read_state().emergency_mode:
+            # Réveil sans préemption : la phase verte en cours garde son début
+            return last_state, green_since
+        return last_state, now
+    phase = traffic_light.plan[state.phase]
+    green_dirs = [d for d in DIRECTIONS if state.lights[DIR_INDEX[d]] == LIGHT_GREEN]
+    red_dirs = [d for d in DIRECTIONS if d not in green_dirs]
+    if phase.clearance:
+        # Dégagement tout rouge : durée fixe, quelle que soit la politique
+        if now - green_since < phase.duration:
+            return last_state, green_since
+    elif not policy.should_switch(now - green_since, green_dirs, red_dirs, detector, now, phase.duration):
+        return last_state, green_since
+    return light_step(traffic_light, emergency_event, notify, last_state), now
+
+
+def light_controller(traffic_light, emergency_event, msg_queue, emergency_flag, policy=None):
+    policy = policy or FixedTimePolicy()
+    detector = QueueDetector(traffic_light)
     last_state = None  # Utilisé pour suivre le dernier état du signal lumineux
+    green_since = float("-inf")
+    notify = lambda message, level=NORMAL: send_to_display(message, msg_queue, level)
+    # Boucle d'événements : le pipe d'urgence et l'échéance de la politique. Un SIGUSR1
+    # (kill -USR1) force aussi un contrôle des préemptions : le handler C de Python n'écrit
+    # qu'un octet dans le pipe, aucun travail ni verrou n'est pris dans le handler. Sans
+    # ambulance en attente, ce réveil (comme celui de tout autre signal) ne change pas les feux
+    selector = selectors.DefaultSelector()
+    selector.register(emergency_event, selectors.EVENT_READ)
+    signal.set_wakeup_fd(emergency_event.write_fd, warn_on_full_buffer=False)
+    signal.signal(signal.SIGUSR1, lambda _sig, _frame: None)
+    deadline = time.monotonic()
     while True:
-        if emergency_event.is_set():
-            # Lorsqu'un événement d'urgence est reçu, passer en mode d'urgence
-            print("light_controller détecte un événement d'urgence, basculement en mode d'urgence.")  # Sortie de débogage pour confirmer le déclenchement de l'événement
-            emergency_event.clear()  # Réinitialiser le drapeau d'événement pour éviter une réactivation
-            send_to_display("Véhicule d'urgence arrivé, changement des feux de signalisation", msg_queue)  # Envoyer le message d'événement d'urgence à l'afficheur
-        else:
-            # En mode normal:
-            # basculer régulièrement l'état des feux de signalisation
-            current_ns = traffic_light.light_states[DIR_INDEX[N]]
-            new_ns = LIGHT_RED if current_ns == LIGHT_GREEN else LIGHT_GREEN
-            traffic_light.set_normal_state(new_ns, LIGHT_RED if new_ns == LIGHT_GREEN else LIGHT_GREEN)
-            # Si l'état a changé, envoyer une mise à jour
-            if last_state != traffic_light.light_states[:]:
-                send_to_display(f"Traffic light updated: {new_ns}  (Rouge==0 et Vert==1)", msg_queue)
-                last_state = traffic_light.light_states[:]
-                traffic_light.print_light_states()  # Afficher les nouveaux états des feux de signalisation
-        time.sleep(UPDATE_INTERVAL)
+        # Se réveiller à la prochaine décision de la politique, ou dès qu'une ambulance est signalée
+        selector.select(max(0.0, deadline - time.monotonic()))
+        if not emergency_event.is_set():
+            # Pendant une préemption, surveiller de près le passage des ambulances
+            deadline += PREEMPTION_POLL if traffic_light.read_state().emergency_mode else policy.poll_interval
+        last_state, green_since = policy_step(traffic_light, policy, detector, emergency_event, notify,
+                                              last_state, green_since, time.monotonic())
+        if traffic_light.read_state().emergency_mode:
+            # Réveil d'urgence : contrôler la fin de la préemption dans PREEMPTION_POLL, pas au prochain tour du plan
+            deadline = min(deadline, time.monotonic() + PREEMPTION_POLL)
+
+
+# === Création des véhicules ===
+def make_vehicle(license_plate, vehicle_type, rng=random, arrival=None, entry=None):
+    entry = entry or rng.choice(DIRECTIONS)
+    exit_dir = rng.choice([d for d in DIRECTIONS if d != entry])
+    return {
+        "license_plate": license_plate,
+        "type": vehicle_type,
+        "entry": entry,
+        "exit": exit_dir,
+        "priority": vehicle_priority(entry, exit_dir),
+        "arrival": time.time() if arrival is None else arrival
+    }
 
 
+def normal_arrival(section_queues, vehicle, traffic_light=None):
+    # Le véhicule circule dans la file sous forme d'enregistrement binaire
+    record = pack_vehicle(vehicle)
+    section_queues[vehicle['entry']].append(record)
+    if traffic_light is not None:
+        traffic_light.notify_arrival(vehicle['entry'])  # réveiller le coordinateur
+        traffic_light.metrics.generated(vehicle['entry'])
+        if traffic_light.events is not None:
+            traffic_light.events.arrivals(record)
+    print(f"\n--- Nouveau véhicule {vehicle['license_plate']} entrant par la direction {vehicle['entry']} ---")
+
+
+def make_batch(first_plate, count, rng=random, arrival=None):
+    """Construit ``count`` véhicules normaux numérotés à partir de ``first_plate``.
+
+    Renvoie, pour chaque direction d'entrée, le bloc de leurs enregistrements binaires.
+    """
+    arrival = time.time() if arrival is None else arrival
+    normal = TYPE_CODE["normal"]
+    records = {d: [] for d in DIRECTIONS}
+    for number in range(first_plate, first_plate + count):
+        entry = rng.randrange(4)
+        exit_code = rng.randrange(3)
+        exit_code += exit_code >= entry  # toute sortie sauf l'entrée
+        entry_dir = DIRECTIONS[entry]
+        records[entry_dir].append(RECORD.pack(normal, number, entry, exit_code,
+                                              PRIORITY_MAP[entry_dir][DIRECTIONS[exit_code]], arrival))
+    return {d: b"".join(r) for d, r in records.items() if r}
+
+
+def bulk_arrival(section_queues, batches, traffic_light=None):
+    # Un seul message par section pour tout le lot
+    for entry, blob in batches.items():
+        section_queues[entry].extend(blob)
+        if traffic_light is not None:
+            traffic_light.notify_arrival(entry, len(blob) // RECORD_SIZE)
+            traffic_light.metrics.generated(entry, count=len(blob) // RECORD_SIZE)
+            if traffic_light.events is not None:
+                traffic_light.events.arrivals(blob)
 
 
 # === Processus de génération de véhicules normalss  ===
-def normal_traffic_gen(section_queues):
+def normal_traffic_gen(section_queues, traffic_light):
+    traffic_light.metrics.bind("generator")
     while True:
         time.sleep(random.randint(1, 3))
-        entry = random.choice(DIRECTIONS)
-        exit_dir = random.choice([d for d in DIRECTIONS if d != entry])
-        vehicle = {
-            "license_plate": generate_license_plate(),
-            "type": "normal",
-            "entry": entry,
-            "exit": exit_dir,
-            "priority": vehicle_priority(entry, exit_dir)
-        }
-        section_queues[entry].append(vehicle)
-        print(f"\n--- Nouveau véhicule {vehicle['license_plate']} entrant par la direction {entry} ---")
+        normal_arrival(section_queues, make_vehicle(generate_license_plate(), "normal"), traffic_light)
+
+
+def batch_traffic_gen(section_queues, traffic_light, rate, tick=0.01):
+    # Génération par lots pour les tests de charge : ``rate`` véhicules/s répartis sur des pas de ``tick`` s
+    traffic_light.metrics.bind("generator")
+    owed = 0.0
+    next_tick = time.monotonic()
+    while True:
+        owed += rate * tick
+        count = int(owed)
+        if count:
+            owed -= count
+            batches = make_batch(reserve_license_plates(count), count)
+            bulk_arrival(section_queues, batches, traffic_light)
+            print(f"\n--- {count} nouveaux véhicules : "
+                  + ", ".join(f"{len(blob) // RECORD_SIZE} par {d}" for d, blob in batches.items()) + " ---")
+        next_tick += tick
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+
+
+def ambulance_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, vehicle):
+    entry, exit_dir = vehicle['entry'], vehicle['exit']
+    # Inscrire l'ambulance dans la table des préemptions avant qu'elle ne puisse passer
+    traffic_light.preemption.add(vehicle)
+    # Pour assurer la priorité des véhicules d'urgence, 
+    # insérer le véhicule en tête de la queue
+    record = pack_vehicle(vehicle)
+    section_queues[entry].push_front(record)
+    traffic_light.notify_arrival(entry)
+    traffic_light.metrics.generated(entry, "priority")
+    if traffic_light.events is not None:
+        traffic_light.events.arrivals(record)
+    print(f"\n--- !!! Véhicule d'urgence  {vehicle['license_plate']} entrant par la direction {entry}, destination {exit_dir} ---")
+
+    # Signaler l'événement d'urgence : le light_controller sert la table des préemptions
+    emergency_event.set()  # Définir le drapeau d'événement d'urgence
+    print("Événement d'urgence déclenché, préparation pour le changement des feux de signalisation")
+
+    if not emergency_flag.value:
+
+        msg_queue.put(f"Véhicule d'urgence {vehicle['license_plate']} arrive, destination {exit_dir}")
+        emergency_flag.value = True
 
 
 # priority_traffic_gen
 # === Processus de génération de véhicules d'urgence ===
 def ambulance_gen(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag):
+    traffic_light.metrics.bind("ambulance")
     while True:
         time.sleep(random.randint(11, 15))
-        entry = random.choice(DIRECTIONS)
-        exit_dir = random.choice([d for d in DIRECTIONS if d != entry])
-        vehicle = {
-            "license_plate": generate_ambulance_plate(),
-            "type": "priority",  # Véhicule d'urgence 
-            "entry": entry,
-            "exit": exit_dir,
-            "priority": vehicle_priority(entry, exit_dir)
-        }
-        # Pour assurer la priorité des véhicules d'urgence, 
-        # insérer le véhicule en tête de la queue
-        section_queues[entry].insert(0, vehicle)
-        print(f"\n--- !!! Véhicule d'urgence  {vehicle['license_plate']} entrant par la direction {entry}, destination {exit_dir} ---")
+        vehicle = make_vehicle(generate_ambulance_plate(), "priority")  # Véhicule d'urgence 
+        ambulance_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, vehicle)
 
-        # Signaler l'événement d'urgence
-        emergency_event.set()  # Définir le drapeau d'événement d'urgence
-        print("Événement d'urgence déclenché, préparation pour le changement des feux de signalisation")
 
-        traffic_light.enter_emergency_mode(entry)
+# === Processus de rejeu d'une trace d'arrivées (remplace les deux générateurs) ===
+def trace_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, record, arrival):
+    vehicle = unpack_vehicle(stamp(record, arrival))
+    if vehicle['type'] == "priority":
+        ambulance_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, vehicle)
+    else:
+        normal_arrival(section_queues, vehicle, traffic_light)
 
-        if not emergency_flag.value:
 
-            msg_queue.put(f"Véhicule d'urgence {vehicle['license_plate']} arrive, destination {exit_dir}")
-            emergency_flag.value = True
+def replay_gen(path, speed, section_queues, traffic_light, emergency_event, msg_queue, emergency_flag):
+    # speed : facteur d'accélération (1 = vitesse d'origine, 0 = au plus vite)
+    traffic_light.metrics.bind("generator")
+    start = time.monotonic()
+    for record in read_trace(path):
+        if speed > 0:
+            delay = start + trace_time(record) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        trace_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, record, time.time())
+    print(f"\n--- Fin du rejeu de la trace {path} ---")
 
 
 # === Processus coordinateur : autoriser le passage des véhicules en fonction de 
 # l'état des feux de signalisation et des règles de priorité ===
-def coordinator(traffic_light, section_queues, msg_queue):
-    def process_direction(direction):
-        processed = []
-        if traffic_light.get_light_state(direction) != LIGHT_GREEN:
-            return processed
-        # Trier les véhicules de la même direction par ordre de priorité 
-        # (droite > tourner à droite > tourner à gauche)
-        vehicles = sorted(list(section_queues[direction]), key=lambda v: v['priority'])
+def pass_message(v):
+    action = ["va tout droite", "tourne à droite", "tourne à gauche"][v['priority'] - 1]
+    return f"Véhicule {v['license_plate']} a passé ：{v['entry']} → {v['exit']} ({action})"
+
+
+def coordinator_step(traffic_light, section_queues, notify, now=None, notify_passed=None):
+    # Une passe du coordinateur, renvoie les véhicules qui ont traversé
+    # ``notify_passed``, s'il est donné, reçoit les enregistrements passés de chaque section en un
+    # seul appel, au lieu d'un message texte par véhicule
+    # Une seule lecture cohérente, sans verrou, des masques de mouvements autorisés
+    # (en mode urgence, seule l'approche de l'ambulance a des mouvements autorisés)
+    state = traffic_light.read_state()
+    needed = needed_sections(state.protected, state.permissive)
+    # Décider en une seule passe pour les quatre sections, puis retirer chaque lot en un appel
+    # Chaque section ne renvoie que ses ambulances et les mouvements utiles à la phase ; les sections
+    # au rouge sont lues aussi, pour que leurs producteurs ne restent pas bloqués sur un anneau plein
+    blobs = {d: section_queues[d].snapshot(needed.get(d, ())) for d in DIRECTIONS}
+    processed = []
+    now = time.time() if now is None else now
+    for d, blob in resolve(blobs, state.protected, state.permissive).items():
+        removed = section_queues[d].remove_many(blob)
+        vehicles = unpack_many(removed)
+        traffic_light.record_departures(d, len(vehicles))
+        if traffic_light.events is not None:
+            traffic_light.events.passes(removed)
+        if traffic_light.passes is not None:
+            # Sans attendre : si le visualiseur a pris du retard, les passages en trop ne sont pas dessinés
+            traffic_light.passes.push(removed)
+        if notify_passed is not None:
+            notify_passed(removed)
         for v in vehicles:
-            can_pass = False
-            opp_dir = OPPOSITE_DIR[direction]
+            processed.append(v)
+            if notify_passed is None:
+                notify(pass_message(v), EMERGENCY if v['type'] == "priority" else NORMAL)
+            traffic_light.metrics.passed(v, now - v['arrival'])
             if v['type'] == "priority":
-                can_pass = True
-            # aller tout droite
-            elif v['priority'] == 1:  
-                can_pass = True
-            # tourner à droite
-            elif v['priority'] == 2: 
-                can_pass = True  
-            # tourner à gauche : attendre les véhicules en face qui vont tout droit
-            elif v['priority'] == 3:
-                if not any(p['priority'] == 1 for p in list(section_queues[opp_dir])):
-                    can_pass = True
-            if can_pass:
-                processed.append(v)
-                # Retirer le véhicule de la queue
-                # pour éviter un traitement répétitif
-                section_queues[direction].remove(v)
-                action = ["va tout droite", "tourne à droite", "tourne à gauche"][v['priority'] - 1]
-                # Il faut passer msg_queue à la fonction send_to_display
-                send_to_display(f"Véhicule {v['license_plate']} a passé ：{v['entry']} → {v['exit']} ({action})", msg_queue)
-        return processed
+                latency = traffic_light.preemption.served(v, now)
+                if latency is not None:
+                    if traffic_light.events is not None:
+                        traffic_light.events.preemption(d, int(v['license_plate'].split("-")[1]), latency)
+                    notify(f"Véhicule d'urgence {v['license_plate']} passé {latency:.2f} s après son arrivée",
+                           EMERGENCY)
+    return processed
 
+
+def coordinator(traffic_light, section_queues, msg_queue):
+    # Il faut passer msg_queue à la fonction send_to_display
+    notify = lambda message, level=NORMAL: send_to_display(message, msg_queue, level)
+    # Les passages partent en trames binaires, mis en texte par le display seulement à l'affichage
+    notify_passed = get_display_channel("localhost", DISPLAY_PORT).send_passed
+    traffic_light.metrics.bind("coordinator")
     while True:
-        if traffic_light.emergency_mode.value:
-            emergency_dir = DIR_INDEX_REVERSE.get(traffic_light.emergency_direction.value, None)
-            if emergency_dir:
-                process_direction(emergency_dir)
+        seen = traffic_light.generations()
+        if not coordinator_step(traffic_light, section_queues, notify, notify_passed=notify_passed):
+            # Rien n'a pu passer : dormir jusqu'au prochain changement de feux ou la prochaine arrivée
+            traffic_light.wait_for_change(seen, timeout=1)
+
+
+# === Simulation en temps virtuel : les processus deviennent des handlers d'événements ===
+def run_virtual(duration, realtime_factor=0.0, seed=None, policy=None, arrival_rates=None,
+                ambulances=True, verbose=True, plan="two-phase", trace=None, events=None, quiet=False):
+    """Simule ``duration`` secondes en temps virtuel et renvoie les véhicules passés.
+
+    ``arrival_rates`` (véhicules/s par direction d'entrée) remplace le générateur
+    d'origine par des arrivées de Poisson, et ``trace`` (fichier de ``workload.py``)
+    par le rejeu des arrivées enregistrées ; chaque véhicule passé reçoit ``passed_at``.
+    ``events`` est le chemin d'un journal d'événements daté en temps simulé ; ``quiet``
+    coupe les messages des rôles mais garde le bilan de fin, que ``verbose=False`` coupe aussi.
+    """
+    import contextlib
+    from queue import SimpleQueue
+    from threading import Event
+
+    rng = random.Random(seed)
+    sched = EventScheduler(realtime_factor)
+    traffic_light = TrafficLight(plan)
+    if events:
+        traffic_light.log_events(EventLog(events, plan, clock=lambda: sched.now))
+    section_queues = {d: SectionStore() for d in DIRECTIONS}
+    emergency_event = Event()
+    msg_queue = SimpleQueue()
+    emergency_flag = mp.Value('b', False)
+    policy = policy or FixedTimePolicy()
+    detector = QueueDetector(traffic_light)
+    passed = []
+
+    def notify(message, level=NORMAL):
+        # Pas de processus display en mode virtuel : les messages vont sur la sortie standard
+        print(message)
+
+    light = {"last_state": None, "green_since": float("-inf")}
+
+    def light_now():
+        light["last_state"], light["green_since"] = policy_step(
+            traffic_light, policy, detector, emergency_event, notify, light["last_state"], light["green_since"],
+            sched.now)
+
+    def on_light():
+        light_now()
+        # Pendant une préemption, surveiller de près le passage des ambulances
+        sched.schedule(PREEMPTION_POLL if traffic_light.read_state().emergency_mode else policy.poll_interval,
+                       on_light)
+
+    def on_preemption():
+        # Le light_controller est réveillé par l'événement d'urgence, puis surveille la fin de la
+        # préemption toutes les PREEMPTION_POLL secondes, sans attendre son prochain tour régulier
+        light_now()
+        if traffic_light.read_state().emergency_mode:
+            sched.schedule(PREEMPTION_POLL, on_preemption)
+
+    def on_normal():
+        normal_arrival(section_queues, make_vehicle(generate_license_plate(), "normal", rng, sched.now), traffic_light)
+        sched.schedule(rng.randint(1, 3), on_normal)
+
+    def on_arrival(entry):
+        vehicle = make_vehicle(generate_license_plate(), "normal", rng, sched.now, entry)
+        normal_arrival(section_queues, vehicle, traffic_light)
+        sched.schedule(rng.expovariate(arrival_rates[entry]), on_arrival, entry)
+
+    def on_ambulance():
+        vehicle = make_vehicle(generate_ambulance_plate(), "priority", rng, sched.now)
+        ambulance_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, vehicle)
+        on_preemption()
+        sched.schedule(rng.randint(11, 15), on_ambulance)
+
+    def on_trace(records, i):
+        trace_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, records[i], sched.now)
+        if emergency_event.is_set():
+            on_preemption()
+        if i + 1 < len(records):
+            sched.schedule_at(trace_time(records[i + 1]), on_trace, records, i + 1)
+
+    def on_coordinator():
+        for v in coordinator_step(traffic_light, section_queues, notify, sched.now):
+            v['passed_at'] = sched.now
+            passed.append(v)
+        sched.schedule(1, on_coordinator)
+
+    # Mêmes cadences initiales que les processus réels
+    sched.schedule(0, on_light)
+    if trace:
+        records = read_trace(trace)
+        if records:
+            sched.schedule_at(trace_time(records[0]), on_trace, records, 0)
+    elif arrival_rates:
+        for entry, rate in arrival_rates.items():
+            if rate > 0:
+                sched.schedule(rng.expovariate(rate), on_arrival, entry)
+    else:
+        sched.schedule(rng.randint(1, 3), on_normal)
+    sched.schedule(0, on_coordinator)
+    if ambulances and not trace:
+        sched.schedule(rng.randint(11, 15), on_ambulance)
+    wall_start = time.monotonic()
+    with open(os.devnull, "w") as devnull:
+        # ``quiet`` ne coupe que les messages des rôles ; ``verbose=False`` coupe aussi le bilan
+        with contextlib.redirect_stdout(devnull if quiet or not verbose else sys.stdout):
+            sched.run(until=duration)
+        elapsed = time.monotonic() - wall_start
+        with contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+            waiting = sum(len(q) for q in section_queues.values())
+            print(f"\nSimulation virtuelle terminée : {duration} s simulées en {elapsed:.2f} s réelles, "
+                  f"{len(passed)} véhicules passés, {waiting} en attente")
+            wait = window_kpis(traffic_light.metrics.totals(), [0] * BLOCK_SIZE, duration)["wait_s"]["normal"]
+            if wait["passed"]:
+                print(f"Attente des véhicules normaux : moyenne {wait['mean']} s, p50 {wait['p50']} s, "
+                      f"p95 {wait['p95']} s, p99 {wait['p99']} s")
+            report = traffic_light.preemption.report()
+            if report["served"]:
+                print(f"Préemptions : {report['served']} véhicules d'urgence en {report['preemptions']} "
+                      f"préemptions, latence moyenne {report['latency_mean_s']} s, max {report['latency_max_s']} s")
+    if events:
+        traffic_light.events.flush()
+    return passed
+
+
+# === Mode asyncio : les rôles deviennent des coroutines d'un seul processus ===
+def run_async(policy=None, plan="two-phase", rate=None, trace=None, replay_speed=1.0, events=None, quiet=False,
+              fps=4.0):
+    """Exécute feux, générateurs, coordinateur, display et agrégateur dans un seul processus.
+
+    Mêmes étapes que le mode processus, en temps réel, mais les sections sont des
+    ``SectionStore`` locaux, le display reçoit les messages par une simple liste et
+    les rôles se réveillent par des ``asyncio.Event`` au lieu de pipes et de conditions.
+    """
+    from collections import deque
+    from queue import SimpleQueue
+
+    traffic_light = TrafficLight(plan)
+    if events:
+        traffic_light.log_events(EventLog(events, plan))
+    section_queues = {d: SectionStore() for d in DIRECTIONS}
+    policy = policy or FixedTimePolicy()
+    msg_queue = SimpleQueue()
+    emergency_flag = mp.Value('b', False)
+    recent = RecentEvents()  # derniers messages du display
+    screen = sys.stdout
+    if quiet:
+        # Seul le display écrit encore sur le terminal
+        sys.stdout = open(os.devnull, "w")
+
+    async def roles():
+        emergency_event = asyncio.Event()  # is_set / set / clear, comme l'événement du mode processus
+        changed = asyncio.Event()  # arrivée ou changement de feux : réveille le coordinateur
+
+        def notify(message, level=NORMAL):
+            recent.append(message, level)
+
+        def notify_passed(records):
+            for offset in range(0, len(records), RECORD_SIZE):
+                record = records[offset:offset + RECORD_SIZE]
+                recent.append(record, record_severity(record))
+
+        async def light():
+            detector = QueueDetector(traffic_light)
+            last_state, green_since = None, float("-inf")
+            deadline = time.monotonic()
+            while True:
+                # Prochaine décision de la politique, ou ambulance signalée
+                try:
+                    await asyncio.wait_for(emergency_event.wait(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+                if not emergency_event.is_set():
+                    deadline += PREEMPTION_POLL if traffic_light.read_state().emergency_mode else policy.poll_interval
+                last_state, green_since = policy_step(traffic_light, policy, detector, emergency_event, notify,
+                                                      last_state, green_since, time.monotonic())
+                if traffic_light.read_state().emergency_mode:
+                    deadline = min(deadline, time.monotonic() + PREEMPTION_POLL)
+                changed.set()
+
+        async def normal():
+            while True:
+                await asyncio.sleep(random.randint(1, 3))
+                normal_arrival(section_queues, make_vehicle(generate_license_plate(), "normal"), traffic_light)
+                changed.set()
+
+        async def batch(tick=0.01):
+            owed = 0.0
+            next_tick = time.monotonic()
+            while True:
+                owed += rate * tick
+                count = int(owed)
+                if count:
+                    owed -= count
+                    bulk_arrival(section_queues, make_batch(reserve_license_plates(count), count), traffic_light)
+                    changed.set()
+                next_tick += tick
+                await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+
+        async def ambulance():
+            while True:
+                await asyncio.sleep(random.randint(11, 15))
+                vehicle = make_vehicle(generate_ambulance_plate(), "priority")
+                ambulance_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, vehicle)
+                changed.set()
+
+        async def replay():
+            start = time.monotonic()
+            for record in read_trace(trace):
+                if replay_speed > 0:
+                    await asyncio.sleep(max(0.0, start + trace_time(record) / replay_speed - time.monotonic()))
+                trace_arrival(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag, record,
+                              time.time())
+                changed.set()
+            print(f"\n--- Fin du rejeu de la trace {trace} ---")
+
+        async def coordinator_task():
+            while True:
+                changed.clear()
+                if not coordinator_step(traffic_light, section_queues, notify, notify_passed=notify_passed):
+                    # Rien n'a pu passer : attendre la prochaine arrivée ou le prochain changement de feux
+                    try:
+                        await asyncio.wait_for(changed.wait(), 1)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(0)  # laisser tourner les autres rôles entre deux passes
+
+        async def display():
+            renderer = TerminalRenderer(screen, fps)
+            view = {}
+            try:
+                while True:
+                    renderer.draw(display_lines(traffic_light, section_queues, msg_queue, recent, view))
+                    await asyncio.sleep(renderer.min_interval)
+            finally:
+                renderer.close()
+
+        async def kpis(interval=1.0):
+            history = deque(maxlen=int(max(WINDOWS) / interval) + 1)
+            start = time.monotonic()
+            while True:
+                aggregate(traffic_light.metrics, history, start, interval)
+                await asyncio.sleep(interval)
+
+        tasks = [light(), coordinator_task(), display(), kpis()]
+        if trace:
+            tasks.append(replay())
         else:
-            for d in DIRECTIONS:
-                process_direction(d)
-        time.sleep(1)
+            tasks += [batch() if rate else normal(), ambulance()]
+        await asyncio.gather(*tasks)
 
+    asyncio.run(roles())
 
 
 # === Gestion de la terminaison du programme ===
@@ -318,35 +832,124 @@ def termination_handler(_sig, _frame):
 
 signal.signal(signal.SIGINT, termination_handler)
 
-# Fonction principale
-def main():
-    manager = mp.Manager()
 
-    # Chaque direction a une queue partagée sous forme de liste
-    section_queues = {d: manager.list() for d in DIRECTIONS}
-    # Utiliser Event pour simuler la notification d'un mode d'urgence
-    emergency_event = mp.Event()
+def run_quiet(target, *args):
+    # Processus sans sortie texte : le journal d'événements reste le seul enregistrement
+    sys.stdout = open(os.devnull, "w")
+    target(*args)
 
-    traffic_light = TrafficLight()
+# Fonction principale
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Simulation de trafic : At the crossroads")
+    parser.add_argument("--virtual", type=float, metavar="DUREE",
+                        help="simuler DUREE secondes en temps virtuel (sans processus ni sleep)")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="secondes simulées par seconde réelle en mode virtuel (0 = au plus vite)")
+    parser.add_argument("--seed", type=int, default=None, help="graine aléatoire du mode virtuel")
+    parser.add_argument("--policy", choices=["fixed", "actuated"], default="fixed",
+                        help="politique des feux : cycle fixe ou actionnée par la longueur des files")
+    parser.add_argument("--plan", choices=list(PLANS), default="two-phase",
+                        help="plan de phases : NS/EW, ou gauches protégées avant / après le tout droit")
+    parser.add_argument("--replay", metavar="TRACE",
+                        help="rejouer une trace d'arrivées de workload.py au lieu des générateurs aléatoires")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="accélération du rejeu en mode processus (1 = vitesse d'origine, 0 = au plus vite)")
+    parser.add_argument("--rate", type=float, metavar="VPS",
+                        help="test de charge en mode processus : VPS véhicules/s générés par lots")
+    parser.add_argument("--sections", choices=["ring", "manager"], default="ring",
+                        help="files des sections : anneaux en mémoire partagée ou proxys d'un processus manager")
+    parser.add_argument("--events", metavar="JOURNAL",
+                        help="écrire les événements dans un journal binaire (analyse : python3 event_log.py JOURNAL)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="sans messages texte des feux, générateurs et coordinateur (le display reste affiché)")
+    parser.add_argument("--fps", type=float, default=4.0,
+                        help="écrans par seconde au plus pour le display (seules les cellules modifiées sont réécrites)")
+    parser.add_argument("--backend", choices=["process", "asyncio"], default="process",
+                        help="rôles en processus séparés, ou en coroutines d'un seul processus asyncio")
+    parser.add_argument("--visual", action="store_true",
+                        help="fenêtre pygame animant les feux et les passages (simulate.py, mode processus)")
+    args = parser.parse_args(argv)
+    if args.visual:
+        if args.virtual is not None or args.backend != "process":
+            parser.error("--visual n'est disponible qu'en mode processus")
+        try:
+            from simulate import visualizer
+        except ImportError:
+            parser.error("--visual nécessite pygame (pip install pygame)")
+    if args.backend == "asyncio" and args.virtual is None:
+        run_async(make_policy(args.policy), args.plan, args.rate, args.replay, args.replay_speed, args.events,
+                  args.quiet, args.fps)
+        return
+    if args.virtual is not None:
+        run_virtual(args.virtual, args.speed, args.seed, make_policy(args.policy), plan=args.plan, trace=args.replay,
+                    events=args.events, quiet=args.quiet)
+        return
+
+    # Chaque direction a sa file d'attente partagée : anneaux en mémoire partagée
+    # (un par producteur, vidés par le coordinateur) ou SectionStore servi par un manager
+    if args.sections == "ring":
+        section_queues = {d: RingSection() for d in DIRECTIONS}
+    else:
+        manager = SectionManager()
+        manager.start()
+        section_queues = {d: manager.SectionStore() for d in DIRECTIONS}
+    # Producteurs des anneaux : 0 pour le trafic normal ou le rejeu, 1 pour les ambulances
+    normal_sections, ambulance_sections = producer_sections(section_queues, 0), producer_sections(section_queues, 1)
+    # Self-pipe pour signaler une urgence au light_controller
+    emergency_event = EmergencyPipe()
+
+    traffic_light = TrafficLight(args.plan)
+    if args.events:
+        traffic_light.log_events(EventLog(args.events, args.plan))
+    if args.visual:
+        traffic_light.passes = SectionRing(slots=8192)
     msg_queue = mp.Queue()  # Queue des messages pour transmettre les alertes d'arrivée des véhicules d'urgence
     # Drapeau d'urgence
 
     emergency_flag = mp.Value('b', False)  # Pour marquer si l'événement d'urgence a déjà été traité
     # Démarrer le processus d'affichage
-    display_process = mp.Process(target=display_server, args=(traffic_light, section_queues, msg_queue))
+    display_process = mp.Process(target=display_server, args=(traffic_light, section_queues, msg_queue, args.fps))
     display_process.start()
 
+    def role(target, *role_args):
+        # Avec --quiet, les rôles autres que le display tournent sans sortie texte
+        if args.quiet:
+            return mp.Process(target=run_quiet, args=(target, *role_args))
+        return mp.Process(target=target, args=role_args)
+
     processes = [
-        mp.Process(target=light_controller, args=(traffic_light, emergency_event, msg_queue, emergency_flag)),
-        mp.Process(target=normal_traffic_gen, args=(section_queues,)),
-        mp.Process(target=coordinator, args=(traffic_light, section_queues, msg_queue)),
-        mp.Process(target=ambulance_gen, args=(section_queues, traffic_light, emergency_event, msg_queue, emergency_flag))
+        role(light_controller, traffic_light, emergency_event, msg_queue, emergency_flag, make_policy(args.policy)),
+        role(coordinator, traffic_light, section_queues, msg_queue),
     ]
+    if args.replay:
+        processes.append(role(replay_gen, args.replay, args.replay_speed, normal_sections,
+                              traffic_light, emergency_event, msg_queue, emergency_flag))
+    else:
+        generator = (role(batch_traffic_gen, normal_sections, traffic_light, args.rate) if args.rate
+                     else role(normal_traffic_gen, normal_sections, traffic_light))
+        processes += [
+            generator,
+            role(ambulance_gen, ambulance_sections, traffic_light, emergency_event, msg_queue, emergency_flag)
+        ]
+
+    processes.append(mp.Process(target=aggregator, args=(traffic_light.metrics,)))
+    if args.visual:
+        processes.append(mp.Process(target=visualizer, args=(traffic_light, traffic_light.passes)))
 
-    for p in processes:
-        p.start()
-    for p in processes:
-        p.join()
+    try:
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+    finally:
+        # Libérer les blocs de mémoire partagée des anneaux (processus principal seulement)
+        if mp.parent_process() is None:
+            if args.sections == "ring":
+                for queue in section_queues.values():
+                    queue.unlink()
+            if traffic_light.passes is not None:
+                traffic_light.passes.unlink()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,145 @@
+import multiprocessing as mp
+import os
+import select
+import struct
+
+from constants import *
+from vehicle_record import DIR_CODE
+
+# === Table partagée des véhicules d'urgence en attente de préemption ===
+# Un emplacement : occupé, entrée (indice dans DIRECTIONS), numéro de plaque, arrivée, échéance
+PENDING = struct.Struct("<BBIdd")
+EMERGENCY_DEADLINE = 5.0  # délai visé entre l'arrivée d'une ambulance et son passage (secondes)
+PREEMPTION_POLL = 0.1  # période de contrôle des feux pendant une préemption (secondes)
+
+# Statistiques : ambulances servies, préemptions, somme et maximum des latences
+SERVED, PREEMPTIONS, LATENCY_SUM, LATENCY_MAX = range(4)
+
+
+def _plate_number(vehicle):
+    return int(vehicle['license_plate'].split("-")[1])
+
+
+class PreemptionTable:
+    """Ambulances en attente, servies par ordre d'échéance.
+
+    Plusieurs ambulances peuvent attendre sur des approches différentes : le
+    contrôleur des feux donne le vert à l'approche de l'échéance la plus proche,
+    et toutes les ambulances de cette approche passent dans la même préemption.
+    Le coordinateur retire chaque ambulance à son passage et cumule la latence
+    entre son arrivée et son passage.
+    """
+
+    def __init__(self, slots=64):
+        self.slots = slots
+        self.table = mp.RawArray('B', slots * PENDING.size)
+        self.stats = mp.RawArray('d', 4)
+        self.lock = mp.Lock()
+
+    def _entries(self):
+        # À appeler en tenant self.lock : (emplacement, entrée, plaque, arrivée, échéance) occupés
+        for slot in range(self.slots):
+            used, entry, plate, arrival, deadline = PENDING.unpack_from(self.table, slot * PENDING.size)
+            if used:
+                yield slot, entry, plate, arrival, deadline
+
+    def add(self, vehicle, deadline=None):
+        arrival = vehicle['arrival']
+        deadline = arrival + EMERGENCY_DEADLINE if deadline is None else deadline
+        with self.lock:
+            used = {slot for slot, *_ in self._entries()}
+            free = next((slot for slot in range(self.slots) if slot not in used), None)
+            if free is None:
+                # Table pleine : l'ambulance passera tout de même, en tête de sa section
+                print(f"Table de préemption pleine, {vehicle['license_plate']} n'est pas suivie")
+                return False
+            PENDING.pack_into(self.table, free * PENDING.size, 1, DIR_CODE[vehicle['entry']],
+                              _plate_number(vehicle), arrival, deadline)
+        return True
+
+    def pending(self):
+        """Ambulances en attente ``(échéance, direction, plaque, arrivée)``, par échéance croissante."""
+        with self.lock:
+            entries = list(self._entries())
+        return sorted((deadline, DIRECTIONS[entry], f"AMB-{plate:04d}", arrival)
+                      for _slot, entry, plate, arrival, deadline in entries)
+
+    def next_direction(self):
+        # Approche à préempter : celle de l'ambulance dont l'échéance est la plus proche
+        pending = self.pending()
+        return pending[0][1] if pending else None
+
+    def started(self):
+        with self.lock:
+            self.stats[PREEMPTIONS] += 1
+
+    def served(self, vehicle, now):
+        """Retire une ambulance qui vient de passer et renvoie sa latence (None si elle n'était pas suivie)."""
+        plate = _plate_number(vehicle)
+        with self.lock:
+            for slot, _entry, number, arrival, _deadline in self._entries():
+                if number == plate:
+                    PENDING.pack_into(self.table, slot * PENDING.size, 0, 0, 0, 0.0, 0.0)
+                    latency = now - arrival
+                    self.stats[SERVED] += 1
+                    self.stats[LATENCY_SUM] += latency
+                    self.stats[LATENCY_MAX] = max(self.stats[LATENCY_MAX], latency)
+                    return latency
+        return None
+
+    def report(self):
+        served, preemptions, latency_sum, latency_max = self.stats[:]
+        return {
+            "served": int(served),
+            "preemptions": int(preemptions),
+            "latency_mean_s": round(latency_sum / served, 3) if served else None,
+            "latency_max_s": round(latency_max, 3) if served else None,
+        }
+
+
+# === Signalisation des urgences au light_controller par self-pipe ===
+class EmergencyPipe:
+    """Remplace ``mp.Event`` pour réveiller le light_controller.
+
+    Signaler une urgence se limite à écrire un octet dans un pipe non bloquant,
+    sans verrou ni sémaphore : c'est sûr depuis n'importe quel processus, et même
+    depuis un handler de signal (``signal.set_wakeup_fd`` sur ``write_fd``). Le
+    light_controller, seul lecteur, surveille ``fileno()`` dans sa boucle
+    d'événements et vide le pipe ; plusieurs signalements rapprochés se
+    fondent en un seul réveil.
+    """
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        os.set_blocking(self.write_fd, False)
+        self._pending = False  # signalement lu mais pas encore traité (processus lecteur)
+
+    def fileno(self):
+        return self.read_fd
+
+    def set(self):
+        try:
+            os.write(self.write_fd, b"!")
+        except BlockingIOError:
+            pass  # pipe plein : un réveil est déjà en attente
+
+    def _drain(self):
+        try:
+            while os.read(self.read_fd, 512):
+                self._pending = True
+        except BlockingIOError:
+            pass
+
+    def is_set(self):
+        self._drain()
+        return self._pending
+
+    def clear(self):
+        self._drain()
+        self._pending = False
+
+    def wait(self, timeout=None):
+        if not self.is_set():
+            select.select([self.read_fd], [], [], timeout)
+        return self.is_set()
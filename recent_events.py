@@ -0,0 +1,45 @@
+import itertools
+
+from vehicle_record import TYPE_CODE, record_type
+
+# === Derniers messages du display, conservés par gravité ===
+NORMAL, EMERGENCY = range(2)
+
+
+def record_severity(record):
+    # Gravité d'un véhicule passé (display_channel.PASSED), lue dans le champ type de l'enregistrement ;
+    # celle des messages texte est donnée par leur producteur
+    return EMERGENCY if record_type(record) == TYPE_CODE["priority"] else NORMAL
+
+
+class RecentEvents:
+    """Anneaux de taille fixe, un par gravité, pour les derniers messages reçus.
+
+    Un message est un texte ou l'enregistrement binaire d'un véhicule passé,
+    mis en texte seulement à l'affichage.
+
+    ``append`` écrit un emplacement et avance un compteur, sans verrou ni
+    décalage de liste : il est prévu pour un seul écrivain (la boucle réseau du
+    display). ``snapshot`` copie chaque anneau d'un bloc, une copie de liste
+    étant atomique sous le GIL, puis remet les messages dans l'ordre d'arrivée.
+    """
+
+    def __init__(self, capacity=10, emergency_capacity=5):
+        self._rings = [[None] * capacity, [None] * emergency_capacity]
+        self._written = [0, 0]
+        self._seq = itertools.count()
+
+    def append(self, message, level=NORMAL):
+        ring, written = self._rings[level], self._written
+        n = written[level]
+        ring[n % len(ring)] = (next(self._seq), message)
+        written[level] = n + 1
+
+    def snapshot(self, level=None):
+        """Messages retenus de gravité ``level`` (toutes par défaut), du plus ancien au plus récent."""
+        levels = range(len(self._rings)) if level is None else [level]
+        entries = [entry for lv in levels for entry in self._rings[lv][:] if entry is not None]
+        return [message for _seq, message in sorted(entries)]
+
+    def __len__(self):
+        return sum(min(n, len(ring)) for n, ring in zip(self._written, self._rings))
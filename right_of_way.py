@@ -0,0 +1,62 @@
+from constants import DIRECTIONS, OPPOSITE_DIR
+from phase_plan import STRAIGHT, approach_bits
+from vehicle_record import RECORD_SIZE, TYPE_CODE
+
+_PRIORITY_TYPE = TYPE_CODE["priority"]
+
+
+# === Résolution groupée du droit de passage pour les quatre sections ===
+def section_counts(blob):
+    """Nombre de véhicules [total, tout droit, droite, gauche] d'un bloc d'enregistrements."""
+    counts = [len(blob) // RECORD_SIZE, 0, 0, 0]
+    # L'octet 7 de chaque enregistrement contient la priorité du mouvement
+    for priority in blob[7::RECORD_SIZE]:
+        counts[priority] += 1
+    return counts
+
+
+def needed_sections(protected, permissive=0):
+    """Sections à lire et, pour chacune, les priorités de mouvement utiles.
+
+    Une approche autorisée fournit ses mouvements autorisés ; l'approche opposée à
+    un mouvement permissif fournit son tout droit, auquel il faut céder le passage.
+    """
+    needed = {}
+    for d in DIRECTIONS:
+        bits = approach_bits(protected | permissive, d)
+        if approach_bits(permissive, d):
+            needed[OPPOSITE_DIR[d]] = needed.get(OPPOSITE_DIR[d], 0) | 1 << (STRAIGHT - 1)
+        if bits:
+            needed[d] = needed.get(d, 0) | bits
+    return {d: tuple(p for p in (1, 2, 3) if bits >> (p - 1) & 1) for d, bits in needed.items()}
+
+
+def resolve(blobs, protected, permissive=0):
+    """Décide en une passe quels véhicules passent, à partir du contenu des sections.
+
+    ``blobs`` associe chaque direction au bloc d'enregistrements de sa section ;
+    ``protected`` et ``permissive`` sont les masques de mouvements de la phase en
+    cours (voir ``phase_plan``). Un mouvement permissif ne passe que si aucun
+    véhicule en face ne va tout droit. Les ambulances passent dès que leur approche
+    a un mouvement autorisé. Renvoie, pour chaque direction, le bloc des véhicules
+    autorisés dans l'ordre de leur section.
+    """
+    passed = {}
+    for d in DIRECTIONS:
+        blob = blobs.get(d, b"")
+        allowed = approach_bits(protected, d)
+        yielding = approach_bits(permissive, d)
+        if not blob or not (allowed | yielding):
+            continue
+        if yielding and section_counts(blobs.get(OPPOSITE_DIR[d], b""))[STRAIGHT]:
+            yielding = 0
+        allowed |= yielding
+        if allowed == 0b111:
+            passed[d] = blob
+            continue
+        view = memoryview(blob)
+        passed[d] = b"".join(
+            view[i:i + RECORD_SIZE] for i in range(0, len(blob), RECORD_SIZE)
+            if (allowed >> (blob[i + 7] - 1)) & 1 or blob[i] == _PRIORITY_TYPE
+        )
+    return passed
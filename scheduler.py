@@ -0,0 +1,56 @@
+import heapq
+import itertools
+import time
+
+
+# === Moteur à événements discrets (horloge virtuelle) ===
+class EventScheduler:
+    """Calendrier d'événements trié par un tas, avec une horloge simulée.
+
+    Les handlers sont appelés dans l'ordre de leur date simulée ; à date égale,
+    dans l'ordre où ils ont été programmés. ``realtime_factor`` donne le nombre
+    de secondes simulées par seconde réelle (0 = aussi vite que possible).
+    """
+
+    def __init__(self, realtime_factor=0.0):
+        self.now = 0.0
+        self.realtime_factor = realtime_factor
+        self._calendar = []  # tas de (date, numéro d'ordre, handler, args)
+        self._seq = itertools.count()
+        self._stopped = False
+
+    def schedule(self, delay, handler, *args):
+        """Programme ``handler(*args)`` dans ``delay`` secondes simulées."""
+        self.schedule_at(self.now + delay, handler, *args)
+
+    def schedule_at(self, when, handler, *args):
+        if when < self.now:
+            raise ValueError(f"Impossible de programmer un événement dans le passé ({when} < {self.now})")
+        heapq.heappush(self._calendar, (when, next(self._seq), handler, args))
+
+    def stop(self):
+        self._stopped = True
+
+    def pending(self):
+        return len(self._calendar)
+
+    def run(self, until=None):
+        """Exécute les événements jusqu'à la date ``until`` (ou jusqu'à épuisement)."""
+        self._stopped = False
+        wall_start = time.monotonic()
+        sim_start = self.now
+        while self._calendar and not self._stopped:
+            when = self._calendar[0][0]
+            if until is not None and when > until:
+                break
+            when, _, handler, args = heapq.heappop(self._calendar)
+            if self.realtime_factor > 0:
+                # Rythmer la simulation sur l'horloge réelle
+                delay = wall_start + (when - sim_start) / self.realtime_factor - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self.now = when
+            handler(*args)
+        if until is not None and not self._stopped:
+            self.now = max(self.now, until)
+        return self.now
@@ -0,0 +1,212 @@
+import struct
+import time
+from multiprocessing import shared_memory
+
+from section_store import SectionStore
+from vehicle_record import RECORD_SIZE
+
+# === Anneau d'enregistrements en mémoire partagée : un producteur, un consommateur ===
+# Disposition : tête (lue jusque-là par le consommateur), queue (écrite jusque-là par le producteur),
+# puis ``slots`` emplacements de RECORD_SIZE octets ; les index croissent sans fin, modulo ``slots``
+_INDEX = struct.Struct("<Q")
+HEAD = 0
+TAIL = 8
+RING_DATA = 16
+
+# Copie publiée par le consommateur pour les observateurs (seqlock) : séquence, nombre total de
+# véhicules, nombre d'enregistrements copiés, puis la tête de chaque anneau au moment de la copie
+_MIRROR = struct.Struct("<QII")
+
+FULL_WAIT = 0.001  # attente du producteur quand l'anneau est plein (secondes)
+
+
+class SectionRing:
+    """File circulaire de taille fixe sans verrou.
+
+    Seul le producteur écrit la queue et seul le consommateur écrit la tête ; chacun
+    n'avance son index qu'après avoir copié les enregistrements.
+    """
+
+    def __init__(self, slots=4096, name=None):
+        self.slots = slots
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=RING_DATA + slots * RECORD_SIZE)
+            self.shm.buf[:RING_DATA] = bytes(RING_DATA)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    def __reduce__(self):
+        # Les processus lancés par spawn se rattachent au même bloc
+        return SectionRing, (self.slots, self.shm.name)
+
+    def indexes(self):
+        buf = self.shm.buf
+        return _INDEX.unpack_from(buf, HEAD)[0], _INDEX.unpack_from(buf, TAIL)[0]
+
+    def push(self, blob):
+        """Écrit autant d'enregistrements de ``blob`` que la place le permet, renvoie le nombre d'octets écrits."""
+        head, tail = self.indexes()
+        count = min(self.slots - (tail - head), len(blob) // RECORD_SIZE)
+        if count:
+            self._copy_in(tail, blob[:count * RECORD_SIZE])
+            _INDEX.pack_into(self.shm.buf, TAIL, tail + count)
+        return count * RECORD_SIZE
+
+    def peek(self, start=None):
+        """Enregistrements présents à partir de l'index ``start`` (la tête par défaut), sans les retirer."""
+        head, tail = self.indexes()
+        start = head if start is None else max(start, head)
+        return self._copy_out(start, tail), tail
+
+    def drain(self):
+        # Consommateur : prendre tous les enregistrements présents
+        blob, tail = self.peek()
+        self.advance(tail)
+        return blob
+
+    def advance(self, head):
+        _INDEX.pack_into(self.shm.buf, HEAD, head)
+
+    def _copy_in(self, index, blob):
+        buf, start = self.shm.buf, index % self.slots
+        first = min(len(blob), (self.slots - start) * RECORD_SIZE)
+        offset = RING_DATA + start * RECORD_SIZE
+        buf[offset:offset + first] = blob[:first]
+        buf[RING_DATA:RING_DATA + len(blob) - first] = blob[first:]
+
+    def _copy_out(self, start, end):
+        if end <= start:
+            return b""
+        buf, first_slot = self.shm.buf, start % self.slots
+        count = end - start
+        first = min(count, self.slots - first_slot)
+        offset = RING_DATA + first_slot * RECORD_SIZE
+        return bytes(buf[offset:offset + first * RECORD_SIZE]) + \
+            bytes(buf[RING_DATA:RING_DATA + (count - first) * RECORD_SIZE])
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# === Section du carrefour en mémoire partagée, remplaçant les proxys du manager ===
+class RingSection:
+    """Remplace ``SectionStore`` dans ``section_queues`` sans processus manager.
+
+    Chaque producteur (générateur, générateur d'ambulances) écrit dans son propre
+    anneau, choisi avec ``producer`` ; le coordinateur, seul consommateur, vide les
+    anneaux dans un ``SectionStore`` local avant chaque lecture, puis publie une copie
+    de la file (au plus ``mirror_slots`` véhicules) que le display lit avec ``view``.
+    """
+
+    def __init__(self, producers=2, slots=4096, mirror_slots=256):
+        self.rings = [SectionRing(slots) for _ in range(producers)]
+        self.mirror_slots = mirror_slots
+        self.mirror = shared_memory.SharedMemory(
+            create=True, size=_MIRROR.size + 8 * producers + mirror_slots * RECORD_SIZE)
+        self.mirror.buf[:_MIRROR.size + 8 * producers] = bytes(_MIRROR.size + 8 * producers)
+        self.producer_index = 0
+        self._store = None  # SectionStore du consommateur, créé dans son processus
+        self._published = -1
+
+    def producer(self, index):
+        # Vue de la même section pour le producteur ``index``
+        view = RingSection.__new__(RingSection)
+        view.__dict__.update(self.__dict__, producer_index=index, _store=None)
+        return view
+
+    # --- Producteurs ---
+    def extend(self, blob):
+        ring = self.rings[self.producer_index]
+        written = ring.push(blob)
+        while written < len(blob):
+            time.sleep(FULL_WAIT)  # anneau plein : attendre que le coordinateur le vide
+            written += ring.push(blob[written:])
+
+    def append(self, record):
+        self.extend(record)
+
+    def push_front(self, record):
+        # Le SectionStore du consommateur sert les véhicules d'urgence en premier
+        self.extend(record)
+
+    # --- Consommateur (coordinateur) ---
+    def _sync(self):
+        if self._store is None:
+            self._store = SectionStore()
+        heads = []
+        for ring in self.rings:
+            blob, tail = ring.peek()
+            self._store.extend(blob)
+            heads.append(tail)
+        # Publier avant de libérer les emplacements : un observateur voit toujours chaque véhicule
+        self._publish(heads)
+        for ring, head in zip(self.rings, heads):
+            ring.advance(head)
+        return self._store
+
+    def _publish(self, heads):
+        store = self._store
+        if store.version() == self._published and heads == [ring.indexes()[0] for ring in self.rings]:
+            return
+        self._published = store.version()
+        records = store.head(self.mirror_slots)
+        buf = self.mirror.buf
+        seq = _MIRROR.unpack_from(buf)[0]
+        _MIRROR.pack_into(buf, 0, seq + 1, store.size(), len(records) // RECORD_SIZE)
+        for i, head in enumerate(heads):
+            _INDEX.pack_into(buf, _MIRROR.size + 8 * i, head)
+        offset = _MIRROR.size + 8 * len(self.rings)
+        buf[offset:offset + len(records)] = records
+        _INDEX.pack_into(buf, 0, seq + 2)
+
+    def snapshot(self, priorities=(1, 2, 3)):
+        return self._sync().snapshot(priorities)
+
+    def remove_many(self, blob):
+        removed = self._sync().remove_many(blob)
+        self._publish([ring.indexes()[0] for ring in self.rings])
+        return removed
+
+    # --- Observateurs (display, n'importe quel processus) ---
+    def _read(self):
+        # Lecture sans verrou : copie publiée, puis enregistrements encore dans les anneaux
+        buf = self.mirror.buf
+        while True:
+            seq, total, copied = _MIRROR.unpack_from(buf)
+            if seq % 2:
+                continue  # publication en cours
+            heads = [_INDEX.unpack_from(buf, _MIRROR.size + 8 * i)[0] for i in range(len(self.rings))]
+            offset = _MIRROR.size + 8 * len(self.rings)
+            records = bytes(buf[offset:offset + copied * RECORD_SIZE])
+            pending = [ring.peek(head) for ring, head in zip(self.rings, heads)]
+            if _MIRROR.unpack_from(buf)[0] == seq:
+                blob = b"".join(p[0] for p in pending)
+                return (seq, *(p[1] for p in pending)), total + len(blob) // RECORD_SIZE, records + blob
+
+    def view(self, known_version=-1):
+        # Comme SectionStore.view ; la copie publiée est tronquée à ``mirror_slots``, pas le nombre de véhicules
+        version, total, records = self._read()
+        if version == known_version:
+            return version, None, None
+        return version, records, total
+
+    def size(self):
+        return self._read()[1]
+
+    def __len__(self):
+        return self.size()
+
+    def unlink(self):
+        for ring in self.rings:
+            ring.unlink()
+        self.mirror.close()
+        self.mirror.unlink()
+
+
+def producer_sections(section_queues, index):
+    # section_queues vu par le producteur ``index`` (inchangé pour les proxys du manager)
+    return {d: q.producer(index) if isinstance(q, RingSection) else q for d, q in section_queues.items()}
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from itertools import chain, islice
+from multiprocessing.managers import BaseManager
+
+from vehicle_record import KEY_SIZE, RECORD_SIZE, TYPE_CODE, record_priority, record_type
+
+_PRIORITY_TYPE = TYPE_CODE["priority"]
+
+
+# === File d'attente d'une section du carrefour, indexée par plaque ===
+class SectionStore:
+    """Véhicules en attente sur une section, rangés par clé (urgence, priorité du mouvement, arrivée).
+
+    Les véhicules circulent sous forme d'enregistrements binaires de
+    ``vehicle_record`` ; les lots sont renvoyés en un seul bloc d'octets.
+
+    Il n'y a que quatre classes (ambulances, puis tout droit, droite, gauche) : chacune
+    est une file FIFO, ce qui donne l'ordre d'un tas sur cette clé avec une arrivée en
+    O(1) et sans aucun tri. L'index plaque -> classe permet de retirer un véhicule en
+    O(1), et ``remove_many`` retire en un seul appel tous les véhicules autorisés à passer.
+
+    Chaque modification incrémente un numéro de version ; les observateurs (display)
+    lisent une copie figée publiée au plus une fois par version avec ``view``,
+    sans rien retirer de la file.
+    """
+
+    def __init__(self):
+        # Classe 0 : véhicules d'urgence, classes 1 à 3 : priorité du mouvement
+        self._classes = [OrderedDict() for _ in range(4)]  # clé de plaque -> enregistrement
+        self._index = {}  # clé de plaque -> classe
+        # Le serveur du manager traite chaque connexion dans son propre thread
+        self._lock = threading.Lock()
+        self._version = 0
+        self._published = (0, b"")  # dernière copie publiée pour les observateurs
+
+    def append(self, record):
+        with self._lock:
+            self._add(record)
+
+    def extend(self, blob):
+        # Ajouter un lot d'enregistrements concaténés en un seul appel
+        with self._lock:
+            for i in range(0, len(blob), RECORD_SIZE):
+                self._add(blob[i:i + RECORD_SIZE])
+
+    def push_front(self, record):
+        # Les véhicules d'urgence sont toujours servis avant les autres, dans leur ordre d'arrivée
+        self.append(record)
+
+    def size(self):
+        return len(self._index)
+
+    def version(self):
+        return self._version
+
+    def head(self, limit):
+        # Les ``limit`` premiers enregistrements dans l'ordre de service
+        with self._lock:
+            return b"".join(islice(chain.from_iterable(c.values() for c in self._classes), limit))
+
+    def snapshot(self, priorities=(1, 2, 3)):
+        """Enregistrements dans l'ordre de service ; les ambulances sont toujours incluses,
+        les autres véhicules seulement pour les mouvements de ``priorities``."""
+        with self._lock:
+            return b"".join(b"".join(self._classes[c].values()) for c in (0, *priorities))
+
+    def view(self, known_version=-1):
+        """Renvoie ``(version, enregistrements, nombre de véhicules)`` ; ``enregistrements`` vaut None si rien n'a changé."""
+        version, vehicles = self._published
+        if version != self._version:
+            with self._lock:
+                self._published = (self._version, b"".join(b"".join(c.values()) for c in self._classes))
+            version, vehicles = self._published
+        if version == known_version:
+            return version, None, None
+        return version, vehicles, len(vehicles) // RECORD_SIZE
+
+    def remove_many(self, blob):
+        # Retirer un lot d'enregistrements, renvoie ceux qui étaient bien présents
+        removed = []
+        with self._lock:
+            for i in range(0, len(blob), RECORD_SIZE):
+                record = self._remove(blob[i:i + KEY_SIZE])
+                if record is not None:
+                    removed.append(record)
+        return b"".join(removed)
+
+    def _add(self, record):
+        key = record[:KEY_SIZE]
+        cls = 0 if record_type(record) == _PRIORITY_TYPE else record_priority(record)
+        self._classes[cls][key] = record
+        self._index[key] = cls
+        self._version += 1
+
+    def _remove(self, key):
+        cls = self._index.pop(key, None)
+        if cls is None:
+            return None
+        self._version += 1
+        return self._classes[cls].pop(key)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class SectionManager(BaseManager):
+    pass
+
+
+SectionManager.register("SectionStore", SectionStore)
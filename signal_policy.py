@@ -0,0 +1,91 @@
+from constants import *
+
+
+# === Détecteurs : longueur des files et débits d'arrivée lus en mémoire partagée ===
+class QueueDetector:
+    """Échantillonne les compteurs d'arrivées et de départs de ``TrafficLight``."""
+
+    def __init__(self, traffic_light, smoothing=0.2):
+        self.traffic_light = traffic_light
+        self.smoothing = smoothing
+        self.arrivals = [0] * 4
+        self.departures = [0] * 4
+        self.last_arrival = [float("-inf")] * 4
+        self.rates = [0.0] * 4  # véhicules/s, moyenne glissante exponentielle
+        self.last_sample = None
+
+    def sample(self, now):
+        arrivals = self.traffic_light.arrivals[:]
+        self.departures = self.traffic_light.departures[:]
+        for i in range(4):
+            new = arrivals[i] - self.arrivals[i]
+            if new:
+                self.last_arrival[i] = now
+            if self.last_sample is not None and now > self.last_sample:
+                instant = new / (now - self.last_sample)
+                self.rates[i] += self.smoothing * (instant - self.rates[i])
+        self.arrivals = arrivals
+        self.last_sample = now
+
+    def depth(self, direction):
+        i = DIR_INDEX[direction]
+        return self.arrivals[i] - self.departures[i]
+
+    def rate(self, direction):
+        return self.rates[DIR_INDEX[direction]]
+
+    def gap(self, direction, now):
+        # Temps écoulé depuis la dernière arrivée sur cette section
+        return now - self.last_arrival[DIR_INDEX[direction]]
+
+
+# === Politiques de feux : décident quand passer à la phase suivante ===
+class FixedTimePolicy:
+    """Cycle fixe : change de phase toutes les ``interval`` secondes (comportement d'origine),
+    ou à la fin de la durée propre de la phase si le plan en fixe une."""
+
+    def __init__(self, interval=UPDATE_INTERVAL, poll_interval=1.0):
+        self.interval = interval
+        self.poll_interval = poll_interval
+
+    def should_switch(self, green_elapsed, green_dirs, red_dirs, detector, now, duration=None):
+        return green_elapsed >= (duration or self.interval)
+
+
+class ActuatedPolicy:
+    """Feux actionnés par la demande mesurée.
+
+    Le vert reste sur l'axe courant tant que l'axe rouge est vide. Sinon il bascule
+    après ``min_green`` si aucune arrivée n'a eu lieu depuis ``gap`` secondes sur
+    l'axe vert (gap-out), et au plus tard au vert maximal (max-out). Ce maximum est
+    réparti entre ``min_green`` et ``max_green`` selon la part du débit de l'axe vert ;
+    une phase à durée propre (gauche protégée) n'est jamais prolongée au-delà.
+    """
+
+    def __init__(self, min_green=4.0, max_green=30.0, gap=2.0, poll_interval=0.5):
+        self.min_green = min_green
+        self.max_green = max_green
+        self.gap = gap
+        self.poll_interval = poll_interval
+
+    def should_switch(self, green_elapsed, green_dirs, red_dirs, detector, now, duration=None):
+        if duration is not None and green_elapsed >= duration:
+            return True
+        if not any(detector.depth(d) > 0 for d in red_dirs):
+            return False  # personne n'attend au rouge : rester au vert
+        if green_elapsed < self.min_green:
+            return False
+        green_rate = sum(detector.rate(d) for d in green_dirs)
+        total_rate = green_rate + sum(detector.rate(d) for d in red_dirs)
+        share = green_rate / total_rate if total_rate > 0 else 0.5
+        if green_elapsed >= self.min_green + (self.max_green - self.min_green) * share:
+            return True  # max-out
+        # gap-out : plus de file ni d'arrivée récente sur l'axe vert
+        return not any(detector.depth(d) > 0 or detector.gap(d, now) < self.gap for d in green_dirs)
+
+
+POLICIES = {"fixed": FixedTimePolicy, "actuated": ActuatedPolicy}
+
+
+def make_policy(name):
+    return POLICIES[name]()
@@ -1,146 +1,198 @@
-import pygame
-import random
+import math
 import time
-import multiprocessing as mp
-
-# 方向常量
-N = "North"
-S = "South"
-W = "West"
-E = "East"
-DIRECTIONS = [N, S, W, E]
-VEHICLE_TYPES = ["normal", "priority"]
-
-# 交通灯状态
-LIGHT_GREEN = (0, 255, 0)
-LIGHT_RED = (255, 0, 0)
-LIGHT_YELLOW = (255, 255, 0)
-
-# 初始化 pygame
-pygame.init()
-
-# 设置窗口大小
-window_size = (600, 600)
-screen = pygame.display.set_mode(window_size)
-pygame.display.set_caption("Traffic Simulation")
-
-# 车道和交通灯的矩形区域
-intersection_rect = pygame.Rect(150, 150, 300, 300)  # 交叉口的矩形区域
-traffic_lights = {
-    N: pygame.Rect(270, 100, 20, 20),
-    S: pygame.Rect(270, 480, 20, 20),
-    W: pygame.Rect(100, 270, 20, 20),
-    E: pygame.Rect(480, 270, 20, 20)
-}
-
-# 车辆类
-class Vehicle:
-    def __init__(self, vehicle_type, entry, exit):
-        self.vehicle_type = vehicle_type
-        self.entry = entry
-        self.exit = exit
-        self.x, self.y = self.get_start_position(entry)
-        self.color = (0, 0, 255) if vehicle_type == "normal" else (255, 0, 0)
-
-    def get_start_position(self, entry):
-        """根据车辆的入口方向设置车辆的起始位置"""
-        if entry == N:
-            return 270, 100
-        elif entry == S:
-            return 270, 500
-        elif entry == W:
-            return 100, 270
-        elif entry == E:
-            return 500, 270
-
-    def move(self):
-        """根据出口方向移动车辆"""
-        if self.entry == N and self.exit == E:
-            self.x += 2
-            self.y += 1
-        elif self.entry == S and self.exit == W:
-            self.x -= 2
-            self.y -= 1
-        # 你可以根据不同的方向添加更多的移动规则
-
-# 主显示函数
-def display_traffic(traffic_lights_state, vehicles):
-    """绘制交通灯、车辆及其运动"""
-    screen.fill((255, 255, 255))  # 背景填充为白色
-
-    # 绘制交叉口
-    pygame.draw.rect(screen, (200, 200, 200), intersection_rect)
-
-    # 绘制交通灯
-    for direction, rect in traffic_lights.items():
-        if traffic_lights_state[direction] == "green":
-            color = LIGHT_GREEN
-        else:
-            color = LIGHT_RED
-        pygame.draw.rect(screen, color, rect)
-
-    # 绘制车辆
-    for vehicle in vehicles:
-        pygame.draw.circle(screen, vehicle.color, (vehicle.x, vehicle.y), 10)
-
-    pygame.display.update()
-
-# 交通灯控制
-def light_controller():
-    """控制交通灯的周期变化"""
-    traffic_lights_state = {N: "green", S: "red", W: "red", E: "green"}
-    while True:
-        time.sleep(5)  # 每5秒切换一次
-        # 交替交通灯的状态
-        if traffic_lights_state[N] == "green":
-            traffic_lights_state[N] = "red"
-            traffic_lights_state[S] = "green"
-            traffic_lights_state[W] = "green"
-            traffic_lights_state[E] = "red"
-        else:
-            traffic_lights_state[N] = "green"
-            traffic_lights_state[S] = "red"
-            traffic_lights_state[W] = "red"
-            traffic_lights_state[E] = "green"
-        return traffic_lights_state
-
-# 车辆生成与移动
-def vehicle_gen():
-    """生成车辆并更新其位置"""
-    vehicles = []
-    for _ in range(10):
-        vehicle_type = random.choice(VEHICLE_TYPES)
-        entry = random.choice(DIRECTIONS)
-        exit = random.choice(DIRECTIONS)
-        vehicle = Vehicle(vehicle_type, entry, exit)
-        vehicles.append(vehicle)
-    return vehicles
-
-# 主函数
-def main():
-    pygame.init()
-
-    # 设置窗口大小
-    window_size = (600, 600)
-    screen = pygame.display.set_mode(window_size)
-    pygame.display.set_caption("Traffic Simulation")
-    
-    running = True
-    vehicles = vehicle_gen()
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-        traffic_lights_state = light_controller()  # 控制交通灯状态
-        display_traffic(traffic_lights_state, vehicles)  # 显示交通状态
-
-        for vehicle in vehicles:
-            vehicle.move()  # 移动车辆
-
-        pygame.time.delay(100)  # 控制帧率
-
-    pygame.quit()
+from collections import deque
+
+import pygame
+
+from constants import *
+from vehicle_record import RECORD
+
+# === Visualiseur temps réel : feux lus dans la mémoire partagée, passages lus dans un anneau ===
+# Le coordinateur écrit chaque véhicule passé dans un SectionRing (sans jamais attendre : si le
+# visualiseur prend du retard, les passages en trop ne sont simplement pas dessinés). Chaque
+# mouvement (entrée, sortie) a un trajet précalculé ; la position d'un véhicule n'est qu'une
+# lecture dans ce trajet selon le temps écoulé depuis son passage.
+WINDOW = 600
+CENTER = WINDOW // 2
+ROAD_HALF = 40  # demi-largeur de la chaussée (une voie entrante, une voie sortante)
+LANE = 20  # décalage du centre de voie par rapport à l'axe de la route
+SPEED = 140.0  # pixels par seconde
+STEP = 2.0  # pixels entre deux points d'un trajet
+MAX_BACKLOG = 1.0  # retard de départ (secondes) au-delà duquel un véhicule n'est pas dessiné
+SPRITE = 8
+HEADWAY = SPRITE / SPEED  # écart minimal (secondes) entre deux véhicules d'un même mouvement : un sprite
+QUEUE_SHOWN = 25  # véhicules en attente dessinés au plus par section (un tous les 10 pixels)
+
+GRAY = (90, 90, 90)
+MARKING = (230, 230, 230)
+GRASS = (60, 130, 60)
+COLORS = {LIGHT_GREEN: (0, 220, 0), LIGHT_RED: (230, 0, 0)}
+
+# Vecteur unitaire du centre vers chaque approche (y vers le bas)
+OUTWARD = {N: (0, -1), S: (0, 1), W: (-1, 0), E: (1, 0)}
+
+
+def _right(heading):
+    # Côté droit d'un conducteur roulant selon ``heading`` (circulation à droite)
+    return -heading[1], heading[0]
+
+
+def _point(outward, distance, heading, offset=LANE):
+    # Point à ``distance`` du centre vers ``outward``, décalé de ``offset`` à droite de ``heading``
+    right = _right(heading)
+    return (CENTER + outward[0] * distance + right[0] * offset,
+            CENTER + outward[1] * distance + right[1] * offset)
+
+
+def movement_path(entry, exit_dir):
+    """Points espacés de STEP pixels, de la ligne d'arrêt au bord de la fenêtre par la voie sortante."""
+    u, v = OUTWARD[entry], OUTWARD[exit_dir]
+    inbound = (-u[0], -u[1])
+    stop = _point(u, ROAD_HALF, inbound)
+    leave, end = _point(v, ROAD_HALF, v), _point(v, CENTER, v)
+    if exit_dir == OPPOSITE_DIR[entry]:
+        crossing = [stop, leave]
+    else:
+        # Virage : courbe de Bézier quadratique dont le point de contrôle est le coin des deux voies
+        k = (leave[0] - stop[0]) * inbound[0] + (leave[1] - stop[1]) * inbound[1]
+        control = (stop[0] + inbound[0] * k, stop[1] + inbound[1] * k)
+        crossing = [((1 - t) ** 2 * stop[0] + 2 * (1 - t) * t * control[0] + t * t * leave[0],
+                     (1 - t) ** 2 * stop[1] + 2 * (1 - t) * t * control[1] + t * t * leave[1])
+                    for t in (i / 32 for i in range(33))]
+    return _resample([*crossing, end])
+
+
+def _resample(polyline):
+    # Points régulièrement espacés le long de la ligne brisée, centrés sur le sprite
+    points, carry = [], 0.0
+    for (x0, y0), (x1, y1) in zip(polyline, polyline[1:]):
+        length = math.hypot(x1 - x0, y1 - y0)
+        d = carry
+        while d < length:
+            t = d / length
+            points.append((round(x0 + (x1 - x0) * t) - SPRITE // 2, round(y0 + (y1 - y0) * t) - SPRITE // 2))
+            d += STEP
+        carry = d - length
+    return points
+
+
+class Visualizer:
+    """Fenêtre pygame du carrefour.
+
+    Chaque image : un fond précalculé, les feux et les files lus dans la mémoire
+    partagée de ``TrafficLight``, puis tous les véhicules en un seul ``blits``.
+    """
+
+    def __init__(self, traffic_light, passes, fps=60):
+        self.traffic_light = traffic_light
+        self.passes = passes
+        self.fps = fps
+        # Trajets des 12 mouvements, indexés par (code d'entrée, code de sortie)
+        self.paths = {(DIRECTIONS.index(a), DIRECTIONS.index(b)): movement_path(a, b)
+                      for a in DIRECTIONS for b in DIRECTIONS if a != b}
+        # Véhicules en mouvement : par mouvement, (instant de départ, sprite) dans l'ordre de départ
+        self.moving = {m: deque() for m in self.paths}
+        self.last_start = {m: 0.0 for m in self.paths}
+        # Emplacements des véhicules en attente, de la ligne d'arrêt vers l'extérieur
+        self.queue_slots = {d: [tuple(c - SPRITE // 2 for c in _point(u, ROAD_HALF + 8 + 10 * k, (-u[0], -u[1])))
+                                for k in range(QUEUE_SHOWN)]
+                            for d, u in OUTWARD.items()}
+
+    def _sprite(self, color):
+        sprite = pygame.Surface((SPRITE, SPRITE)).convert()
+        sprite.fill(color)
+        return sprite
+
+    def _background(self):
+        background = pygame.Surface((WINDOW, WINDOW)).convert()
+        background.fill(GRASS)
+        pygame.draw.rect(background, GRAY, (CENTER - ROAD_HALF, 0, 2 * ROAD_HALF, WINDOW))
+        pygame.draw.rect(background, GRAY, (0, CENTER - ROAD_HALF, WINDOW, 2 * ROAD_HALF))
+        for u in OUTWARD.values():
+            # Axe de la route, puis ligne d'arrêt en travers de la voie entrante
+            inbound = (-u[0], -u[1])
+            pygame.draw.line(background, MARKING, _point(u, ROAD_HALF, inbound, 0), _point(u, CENTER, inbound, 0))
+            pygame.draw.line(background, MARKING, _point(u, ROAD_HALF, inbound, 0),
+                             _point(u, ROAD_HALF, inbound, 2 * LANE), 3)
+        return background
+
+    def _arrivals(self, now, sprites):
+        # Les véhicules passés depuis l'image précédente entrent dans le carrefour
+        for type_code, _number, entry, exit_code, _priority, _arrival in RECORD.iter_unpack(self.passes.drain()):
+            movement = (entry, exit_code)
+            start = max(now, self.last_start[movement] + HEADWAY)
+            if start - now > MAX_BACKLOG:
+                continue  # mouvement saturé : les départs restent dans l'ordre, ce véhicule est omis
+            self.last_start[movement] = start
+            self.moving[movement].append((start, sprites[type_code]))
+
+    def _vehicles(self, now):
+        # Position = point du trajet atteint depuis le départ : aucune logique par véhicule
+        batch = []
+        steps_per_second = SPEED / STEP
+        for movement, vehicles in self.moving.items():
+            path = self.paths[movement]
+            last = len(path)
+            while vehicles and (now - vehicles[0][0]) * steps_per_second >= last:
+                vehicles.popleft()
+            batch += [(sprite, path[int((now - start) * steps_per_second)])
+                      for start, sprite in vehicles if start <= now]
+        return batch
+
+    def _queues(self, queued_sprite):
+        # Longueur des files (arrivées - départs) dessinée sur la voie entrante, avant la ligne d'arrêt
+        traffic_light = self.traffic_light
+        batch = []
+        for d in DIRECTIONS:
+            i = DIR_INDEX[d]
+            depth = traffic_light.arrivals[i] - traffic_light.departures[i]
+            batch += [(queued_sprite, slot) for slot in self.queue_slots[d][:max(depth, 0)]]
+        return batch
+
+    def run(self):
+        pygame.init()
+        screen = pygame.display.set_mode((WINDOW, WINDOW))
+        pygame.display.set_caption("Simulation de trafic : At the crossroads")
+        background = self._background()
+        sprites = [self._sprite((40, 90, 230)), self._sprite((255, 40, 40))]  # normal, priority
+        queued_sprite = self._sprite((200, 200, 60))
+        font = pygame.font.SysFont(None, 22)
+        clock = pygame.time.Clock()
+        caption, caption_at = None, 0.0
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    return
+            now = time.monotonic()
+            self._arrivals(now, sprites)
+            state = self.traffic_light.read_state()
+            screen.blit(background, (0, 0))
+            for d, u in OUTWARD.items():
+                # Feu au bord droit de la voie entrante, à hauteur de la ligne d'arrêt
+                light = _point(u, ROAD_HALF + 8, (-u[0], -u[1]), 2 * LANE + 10)
+                pygame.draw.circle(screen, COLORS[state.lights[DIR_INDEX[d]]], light, 7)
+            vehicles = self._vehicles(now)
+            screen.blits(self._queues(queued_sprite) + vehicles, doreturn=False)
+            if now - caption_at > 0.5:
+                # Texte recalculé deux fois par seconde seulement
+                phase = "Urgence " + DIR_INDEX_REVERSE[state.emergency_direction] if state.emergency_mode \
+                    else self.traffic_light.plan[state.phase].name
+                caption = font.render(f"{phase} | {len(vehicles)} véhicules | {clock.get_fps():.0f} fps",
+                                      True, (255, 255, 255))
+                caption_at = now
+            screen.blit(caption, (8, 8))
+            pygame.display.flip()
+            clock.tick(self.fps)
+
+
+def visualizer(traffic_light, passes, fps=60):
+    # Processus du visualiseur, lancé par ppc_projet.py --visual
+    Visualizer(traffic_light, passes, fps).run()
+
 
 if __name__ == "__main__":
-    main()
+    # Lancer la simulation complète avec le visualiseur
+    import sys
+    from ppc_projet import main
+    main(["--visual", *sys.argv[1:]])
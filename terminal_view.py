@@ -0,0 +1,94 @@
+import shutil
+import sys
+import time
+import unicodedata
+
+# === Rendu du display dans le terminal : seules les cellules modifiées sont réécrites ===
+CLEAR = "\x1b[H\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+ERASE_LINE_END = "\x1b[K"
+MERGE_GAP = 6  # deux zones modifiées plus proches sont réécrites d'un seul tenant (un déplacement coûte ~7 octets)
+FALLBACK_SIZE = (120, 50)  # colonnes, lignes quand la sortie n'est pas un terminal
+
+
+def _cells(line, width):
+    # Une cellule par colonne du terminal : un caractère large (【, 🚑...) occupe sa cellule et une cellule vide
+    cells = []
+    for ch in line:
+        wide = unicodedata.east_asian_width(ch) in "WF"
+        if len(cells) + 1 + wide > width:
+            break
+        cells.append(ch)
+        if wide:
+            cells.append("")
+    return cells
+
+
+def _spans(old, new):
+    # Zones [début, fin) des cellules de ``new`` qui diffèrent de ``old``
+    spans = []
+    for x in range(len(new)):
+        if x < len(old) and old[x] == new[x]:
+            continue
+        if spans and x - spans[-1][1] <= MERGE_GAP:
+            spans[-1][1] = x + 1
+        else:
+            spans.append([x, x + 1])
+    return spans
+
+
+class TerminalRenderer:
+    """Garde l'écran affiché en mémoire et n'écrit que la différence avec le nouvel écran.
+
+    ``draw`` reçoit les lignes de texte de l'écran complet, les coupe à la taille du
+    terminal, et n'émet que des déplacements du curseur ANSI et les cellules
+    modifiées, en un seul ``write`` ; les appels plus rapprochés que ``1 / fps``
+    secondes sont ignorés.
+    """
+
+    def __init__(self, stream=None, fps=4.0):
+        self.stream = stream or sys.stdout
+        self.min_interval = 1.0 / fps
+        self._rows = None  # écran affiché, en cellules ; None : tout redessiner
+        self._size = None
+        self._last = float("-inf")
+
+    def draw(self, lines, now=None):
+        """Affiche ``lines`` ; renvoie False si l'écran n'a pas été redessiné (limite de fps)."""
+        now = time.monotonic() if now is None else now
+        if now - self._last < self.min_interval:
+            return False
+        self._last = now
+        size = shutil.get_terminal_size(FALLBACK_SIZE)
+        out = []
+        if self._rows is None or size != self._size:
+            # Premier écran ou terminal redimensionné : effacer une fois, puis seulement des différences
+            out.append(HIDE_CURSOR + CLEAR)
+            self._rows, self._size = [], size
+        rows = [_cells(line, size.columns) for line in lines[:size.lines - 1]]
+        for y, row in enumerate(rows):
+            old = self._rows[y] if y < len(self._rows) else []
+            if row == old:
+                continue
+            for start, end in _spans(old, row):
+                if row[start] == "":
+                    start -= 1  # ne pas commencer au milieu d'un caractère large
+                if end < len(row) and row[end] == "":
+                    end += 1
+                out.append(f"\x1b[{y + 1};{start + 1}H" + "".join(row[start:end]))
+            if len(row) < len(old):
+                out.append(f"\x1b[{y + 1};{len(row) + 1}H" + ERASE_LINE_END)
+        for y in range(len(rows), len(self._rows)):
+            if self._rows[y]:
+                out.append(f"\x1b[{y + 1};1H" + ERASE_LINE_END)
+        self._rows = rows
+        if out:
+            self.stream.write("".join(out))
+            self.stream.flush()
+        return True
+
+    def close(self):
+        # Rendre le curseur et le placer sous le dernier écran
+        self.stream.write(f"\x1b[{len(self._rows or []) + 1};1H" + SHOW_CURSOR)
+        self.stream.flush()
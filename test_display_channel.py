@@ -0,0 +1,57 @@
+from display_channel import ALERT, FRAME, PASSED, TEXT, FrameReader, dispatch
+from recent_events import EMERGENCY, NORMAL
+from vehicle_record import RECORD, TYPE_CODE
+
+
+class ChunkedConnection:
+    # Connexion simulée qui rend les octets par morceaux imposés, comme des lectures TCP partielles
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def recv_into(self, view):
+        chunk = self.chunks[0]
+        n = min(len(view), len(chunk))
+        view[:n] = chunk[:n]
+        if n == len(chunk):
+            self.chunks.pop(0)
+        else:
+            self.chunks[0] = chunk[n:]
+        return n
+
+
+def _frame(kind, payload):
+    return FRAME.pack(len(payload), kind) + payload
+
+
+def _read_all(reader, conn):
+    frames = []
+    while conn.chunks:
+        reader.recv(conn)
+        frames += [(kind, bytes(payload)) for kind, payload in reader.frames()]
+    return frames
+
+
+def test_frames_split_across_reads():
+    data = _frame(TEXT, "Feux : phase North-South".encode()) + _frame(ALERT, "Préemption".encode())
+    # Coupures au milieu d'un en-tête, puis au milieu d'une charge utile
+    conn = ChunkedConnection([data[:3], data[3:10], data[10:31], data[31:]])
+    assert _read_all(FrameReader(), conn) == [(TEXT, "Feux : phase North-South".encode()),
+                                              (ALERT, "Préemption".encode())]
+
+
+def test_buffer_grows_for_a_large_frame():
+    payload = bytes(range(256)) * 4
+    data = _frame(TEXT, b"avant") + _frame(PASSED, payload) + _frame(TEXT, b"apres")
+    reader = FrameReader(size=16)
+    conn = ChunkedConnection([data[i:i + 7] for i in range(0, len(data), 7)])
+    assert _read_all(reader, conn) == [(TEXT, b"avant"), (PASSED, payload), (TEXT, b"apres")]
+    assert len(reader.buffer) >= len(payload)
+
+
+def test_dispatch_levels():
+    ambulance = RECORD.pack(TYPE_CODE["priority"], 1, 0, 1, 1, 0.0)
+    car = RECORD.pack(TYPE_CODE["normal"], 2, 0, 1, 1, 0.0)
+    received = []
+    dispatch([(TEXT, memoryview(b"texte")), (ALERT, memoryview(b"urgence")),
+              (PASSED, memoryview(car + ambulance))], lambda message, level: received.append((message, level)))
+    assert received == [("texte", NORMAL), ("urgence", EMERGENCY), (car, NORMAL), (ambulance, EMERGENCY)]
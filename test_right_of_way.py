@@ -0,0 +1,44 @@
+from constants import *
+from phase_plan import PLANS
+from right_of_way import needed_sections, resolve
+from vehicle_record import DIR_CODE, RECORD, TYPE_CODE
+
+# Phase North-South du plan two-phase : tout droit et droite protégés, gauche permissive
+NORTH_SOUTH = PLANS["two-phase"][0]
+
+
+def _vehicle(number, entry, exit_dir, vehicle_type="normal"):
+    return RECORD.pack(TYPE_CODE[vehicle_type], number, DIR_CODE[entry], DIR_CODE[exit_dir],
+                       PRIORITY_MAP[entry][exit_dir], float(number))
+
+
+def _resolve(blobs):
+    return resolve(blobs, NORTH_SOUTH.protected, NORTH_SOUTH.permissive)
+
+
+def test_permissive_left_yields_to_opposing_straight():
+    left, right = _vehicle(1, N, E), _vehicle(2, N, W)
+    straight = _vehicle(3, S, N)
+    passed = _resolve({N: left + right, S: straight})
+    # La gauche de North attend : South va tout droit en face
+    assert passed == {N: right, S: straight}
+
+
+def test_permissive_left_goes_without_opposing_straight():
+    left, right = _vehicle(1, N, E), _vehicle(2, N, W)
+    opposing_right = _vehicle(3, S, E)
+    passed = _resolve({N: left + right, S: opposing_right})
+    assert passed == {N: left + right, S: opposing_right}
+
+
+def test_ambulance_turning_left_does_not_yield():
+    ambulance, car = _vehicle(1, N, E, "priority"), _vehicle(2, N, E)
+    passed = _resolve({N: ambulance + car, S: _vehicle(3, S, N), W: _vehicle(4, W, E)})
+    assert passed[N] == ambulance
+    assert W not in passed  # feu rouge
+
+
+def test_needed_sections_reads_opposing_straight():
+    assert needed_sections(NORTH_SOUTH.protected, NORTH_SOUTH.permissive) == {N: (1, 2, 3), S: (1, 2, 3)}
+    only_left = needed_sections(0, NORTH_SOUTH.permissive)
+    assert only_left == {N: (1, 3), S: (1, 3)}
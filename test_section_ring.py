@@ -0,0 +1,51 @@
+import pytest
+
+from constants import *
+from section_ring import RingSection, SectionRing
+from vehicle_record import DIR_CODE, RECORD, RECORD_SIZE, TYPE_CODE
+
+
+def _records(first, count, entry=N, exit_dir=S):
+    return b"".join(RECORD.pack(TYPE_CODE["normal"], n, DIR_CODE[entry], DIR_CODE[exit_dir], 1, float(n))
+                    for n in range(first, first + count))
+
+
+@pytest.fixture
+def ring():
+    ring = SectionRing(slots=4)
+    yield ring
+    ring.unlink()
+
+
+def test_ring_wraps_around(ring):
+    # Les index croissent sans fin : la deuxième écriture passe la fin du bloc et reprend au début
+    assert ring.push(_records(1, 3)) == 3 * RECORD_SIZE
+    assert ring.drain() == _records(1, 3)
+    assert ring.push(_records(4, 3)) == 3 * RECORD_SIZE
+    assert ring.indexes() == (3, 6)
+    assert ring.peek()[0] == _records(4, 3)
+    assert ring.peek(4)[0] == _records(5, 2)  # à partir de l'index 4, après la fin du bloc
+    assert ring.drain() == _records(4, 3)
+    assert ring.drain() == b""
+
+
+def test_full_ring_takes_only_what_fits(ring):
+    assert ring.push(_records(1, 6)) == 4 * RECORD_SIZE
+    assert ring.push(_records(5, 2)) == 0
+    assert ring.drain() == _records(1, 4)
+    assert ring.push(_records(5, 2)) == 2 * RECORD_SIZE
+    assert ring.drain() == _records(5, 2)
+
+
+def test_view_counts_past_the_mirror():
+    section = RingSection(slots=64, mirror_slots=4)
+    try:
+        section.producer(0).extend(_records(1, 10))
+        section.snapshot()
+        section.producer(1).extend(_records(11, 2))  # encore dans l'anneau, pas dans la copie publiée
+        version, records, count = section.view()
+        assert count == 12 == section.size()
+        assert records == _records(1, 4) + _records(11, 2)
+        assert section.view(version)[1] is None
+    finally:
+        section.unlink()
@@ -0,0 +1,58 @@
+import struct
+
+from constants import DIRECTIONS
+
+# === Enregistrement binaire compact d'un véhicule (16 octets) ===
+# type (B), numéro de plaque (I), entrée (B), sortie (B), priorité (B), heure d'arrivée (d)
+RECORD = struct.Struct("<BIBBBd")
+RECORD_SIZE = RECORD.size
+KEY_SIZE = 5  # type + numéro de plaque : identifie un véhicule de manière unique
+
+VEHICLE_TYPES = ["normal", "priority"]
+TYPE_CODE = {t: i for i, t in enumerate(VEHICLE_TYPES)}
+PLATE_PREFIX = ["CAR", "AMB"]
+DIR_CODE = {d: i for i, d in enumerate(DIRECTIONS)}
+
+
+def plate_key(license_plate):
+    # "AMB-0003" -> les 5 premiers octets de l'enregistrement correspondant
+    prefix, number = license_plate.split("-")
+    return struct.pack("<BI", PLATE_PREFIX.index(prefix), int(number))
+
+
+def pack_vehicle(vehicle):
+    return RECORD.pack(TYPE_CODE[vehicle['type']],
+                       int(vehicle['license_plate'].split("-")[1]),
+                       DIR_CODE[vehicle['entry']],
+                       DIR_CODE[vehicle['exit']],
+                       vehicle['priority'],
+                       vehicle.get('arrival', 0.0))
+
+
+def _to_dict(fields):
+    type_code, number, entry, exit_dir, priority, arrival = fields
+    return {
+        "license_plate": f"{PLATE_PREFIX[type_code]}-{number:04d}",
+        "type": VEHICLE_TYPES[type_code],
+        "entry": DIRECTIONS[entry],
+        "exit": DIRECTIONS[exit_dir],
+        "priority": priority,
+        "arrival": arrival
+    }
+
+
+def unpack_vehicle(record):
+    return _to_dict(RECORD.unpack(record))
+
+
+def unpack_many(blob):
+    # Décoder un lot d'enregistrements concaténés
+    return [_to_dict(fields) for fields in RECORD.iter_unpack(blob)]
+
+
+def record_type(record):
+    return record[0]
+
+
+def record_priority(record):
+    return record[7]
@@ -0,0 +1,131 @@
+import heapq
+import random
+import struct
+
+from constants import *
+from vehicle_record import RECORD, RECORD_SIZE, TYPE_CODE, DIR_CODE
+
+# === Génération reproductible du trafic et traces d'arrivées rejouables ===
+# Fichier de trace : en-tête (magique, version), puis un enregistrement vehicle_record par arrivée,
+# trié par date ; le champ « arrivée » contient la date en secondes depuis le début de la trace
+TRACE_MAGIC = b"PPCT"
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct("<4sH")
+
+# Sortie correspondant à chaque mouvement depuis une approche
+MOVEMENT_EXIT = {entry: {priority: exit_dir for exit_dir, priority in exits.items()}
+                 for entry, exits in PRIORITY_MAP.items()}
+
+
+class WorkloadProfile:
+    """Débits d'arrivée de Poisson par approche, modulés selon l'heure de la journée.
+
+    ``rates`` : véhicules/s par approche ; ``hourly`` : 24 multiplicateurs ;
+    ``turning`` : proportions (tout droit, droite, gauche) par approche ;
+    ``ambulance_rate`` : ambulances/s sur l'ensemble du carrefour.
+    """
+
+    def __init__(self, rates, hourly=None, turning=None, ambulance_rate=0.0):
+        self.rates = rates
+        self.hourly = hourly or [1.0] * 24
+        self.turning = turning or {d: (1, 1, 1) for d in DIRECTIONS}
+        self.ambulance_rate = ambulance_rate
+
+    def multiplier(self, t, start_hour=0):
+        return self.hourly[int(start_hour + t / 3600) % 24]
+
+
+# Heures de pointe le matin et le soir, axe NS plus chargé
+_COMMUTE_HOURS = [0.2, 0.1, 0.1, 0.1, 0.2, 0.5, 1.2, 2.0, 2.5, 1.5, 1.0, 1.0,
+                  1.2, 1.0, 1.0, 1.2, 1.8, 2.5, 2.2, 1.5, 1.0, 0.7, 0.5, 0.3]
+
+PROFILES = {
+    # Même débit moyen que normal_traffic_gen (un véhicule toutes les 2 s) et ambulance_gen
+    "uniform": WorkloadProfile({d: 0.125 for d in DIRECTIONS}, ambulance_rate=1 / 13),
+    "commute": WorkloadProfile({N: 0.3, S: 0.3, E: 0.12, W: 0.12}, hourly=_COMMUTE_HOURS,
+                               turning={N: (6, 2, 2), S: (6, 2, 2), E: (4, 3, 3), W: (4, 3, 3)},
+                               ambulance_rate=1 / 600),
+}
+
+
+def _poisson_times(rng, rate, profile, duration, start_hour):
+    # Processus de Poisson non homogène par amincissement (thinning)
+    peak = rate * max(profile.hourly)
+    if peak <= 0:
+        return
+    t = 0.0
+    while True:
+        t += rng.expovariate(peak)
+        if t >= duration:
+            return
+        if rng.random() * peak < rate * profile.multiplier(t, start_hour):
+            yield t
+
+
+def _stream(rng, type_code, entries, weights, times):
+    # Un flux d'arrivées lié à son propre générateur : (date, type, entrée, mouvement)
+    for t in times:
+        entry = entries[0] if len(entries) == 1 else rng.choice(entries)
+        yield t, type_code, entry, rng.choices((1, 2, 3), weights)[0]
+
+
+def generate_arrivals(profile, duration, seed=0, start_hour=0):
+    """Renvoie la liste triée des enregistrements d'arrivée pour ``duration`` secondes."""
+    streams = []
+    for entry in DIRECTIONS:
+        rng = random.Random(f"{seed}-{entry}")
+        times = _poisson_times(rng, profile.rates[entry], profile, duration, start_hour)
+        streams.append(_stream(rng, TYPE_CODE["normal"], [entry], profile.turning[entry], times))
+    if profile.ambulance_rate > 0:
+        rng = random.Random(f"{seed}-ambulance")
+        times = _poisson_times(rng, profile.ambulance_rate, profile, duration, start_hour)
+        streams.append(_stream(rng, TYPE_CODE["priority"], DIRECTIONS, (1, 1, 1), times))
+    records = []
+    plates = [0, 0]  # numéros de plaque par type de véhicule
+    for t, type_code, entry, priority in heapq.merge(*streams):
+        plates[type_code] += 1
+        exit_dir = MOVEMENT_EXIT[entry][priority]
+        records.append(RECORD.pack(type_code, plates[type_code], DIR_CODE[entry], DIR_CODE[exit_dir], priority, t))
+    return records
+
+
+def write_trace(path, records):
+    with open(path, "wb") as f:
+        f.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+        f.write(b"".join(records))
+
+
+def read_trace(path):
+    with open(path, "rb") as f:
+        magic, version = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"{path} n'est pas une trace d'arrivées valide")
+        data = f.read()
+    return [data[i:i + RECORD_SIZE] for i in range(0, len(data), RECORD_SIZE)]
+
+
+def trace_time(record):
+    return RECORD.unpack(record)[5]
+
+
+def stamp(record, arrival):
+    # Remplacer la date de la trace par l'heure réelle d'arrivée dans la file
+    return record[:8] + struct.pack("<d", arrival)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Génère une trace d'arrivées reproductible")
+    parser.add_argument("output", help="fichier de trace à écrire")
+    parser.add_argument("--profile", choices=list(PROFILES), default="uniform")
+    parser.add_argument("--duration", type=float, default=3600, help="durée de la trace (secondes)")
+    parser.add_argument("--start-hour", type=int, default=0, help="heure de début pour le profil horaire")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    records = generate_arrivals(PROFILES[args.profile], args.duration, args.seed, args.start_hour)
+    write_trace(args.output, records)
+    print(f"{len(records)} arrivées écrites dans {args.output} ({len(records) * RECORD_SIZE} octets)")
+
+
+if __name__ == "__main__":
+    main()